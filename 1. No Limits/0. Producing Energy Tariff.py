@@ -1,9 +1,10 @@
 import pandas as pd
 import wntr
-import wntr.network.controls as controls
 import random
 import matplotlib.pyplot as plt
 
+from wds_sim import load_network
+
 tariff = pd.DataFrame(index = [0, 3600, 7200, 10800, 14400, 18000, 21600, 
                                      25200, 28800, 32400, 36000, 39600,  43200, 
                                      46800, 50400, 54000, 57600, 61200, 64800, 
@@ -11,29 +12,7 @@ tariff = pd.DataFrame(index = [0, 3600, 7200, 10800, 14400, 18000, 21600,
 
 ### importing water network model ###
 inp_file = 'Net3.inp'
-wn = wntr.network.WaterNetworkModel(inp_file)
-
-### Setting Simulation Options ###
-wn.options.time.hydraulic_timestep = 3600
-wn.options.time.duration = 82800
-wn.options.time.report_timestep = 3600
-wn.options.energy.global_efficiency = 75
-
-### Removing Controls and Isolating Tanks ###
-for control in wn.control_name_list:
-    wn.remove_control(control)
-   
-wn.get_link('20').status = 'closed' 
-wn.get_link('40').status = 'closed'
-wn.get_link('50').status = 'closed'
-wn.get_link('330').status = 'open'
-wn.get_link('10').status = 'open'
-
-pump = wn.get_link('10')
-act2 = controls.ControlAction(pump, 'status', 1)
-cond2 = controls.SimTimeCondition(wn, '=', '0:00:00')
-ctrl2 = controls.Control(cond2, act2, name='control2')
-wn.add_control('NewTimeControl', ctrl2)
+wn = load_network(inp_file)
 
 ### Simulation ###
 sim = wntr.sim.EpanetSimulator(wn)
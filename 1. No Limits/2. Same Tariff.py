@@ -1,34 +1,21 @@
 import numpy as np
 import pandas as pd
 import wntr
-import wntr.network.controls as controls
-import random
 import matplotlib.pyplot as plt
 from matplotlib import cm
+import os
+import logging
+
+from wds_sim import (load_network, all_demands, simulate_baseline, price_energy, assign_pooled_demand, shift_demands_elasticity, ScenarioJournal,
+                     ResultsCube, ELASTICITY_TABLES, write_results, read_results, write_table, read_table,
+                     run_epanet, run_epanet_pumps, hydraulics_energy, ScenarioScreen, SweepProgress, stage_timer, write_summary)
+
+### progress of the sweep (scenarios per second, ETA) is logged ###
+logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(message)s')
+
 #####################
 ##### FUNCTIONS #####
 
-### Returns all demands at each node and hour ###
-def all_demands(wn):
-    Index = [0, 3600, 7200, 10800, 14400, 18000, 21600, 25200, 28800, 32400, 36000, 39600, 
-             43200, 46800, 50400, 54000, 57600, 61200, 64800, 68400, 72000, 75600, 79200, 82800]
-    df= pd.DataFrame(index = Index)
-    for name in wn.junction_name_list:
-        junction = wn.get_node(name)
-        lst = [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]
-        for demand in junction.demand_timeseries_list:
-            base = demand.base_value
-            pat = demand.pattern
-            pattern = wn.get_pattern(pat)
-            pattern_multipliers = pattern.multipliers
-            dvs = base*pattern_multipliers
-            lst = np.add(lst,dvs)
-        df[name] = lst    
-    for col in df.columns:
-        if df[col].sum()==0:
-            df = df.drop([col],axis =1)         
-    return df
-
 ### returns dataframe with hourly distribution of total demand in network ###
 def total_hourly_demand(wn,Ta):
     df = all_demands(wn)
@@ -57,41 +44,30 @@ E = np.arange(step,1+step,step).round(2).tolist() #elasticities
 Tariff = pd.read_excel('Tariff.xlsx',index_col=0)
 water_tariff = Tariff.copy()
 
-### Opening all different results dataframes ##
-EE= E.copy().insert(0,0)
-energy_savings_percentage = pd.DataFrame(index = EE, columns = Tariff.columns)
-cost_savings_percentage = pd.DataFrame(index = EE, columns = Tariff.columns)
-revenue_increase_percentage = pd.DataFrame(index = EE, columns = Tariff.columns)
-net_increase_percentage = pd.DataFrame(index = EE, columns = Tariff.columns)
-total_demand_difference = pd.DataFrame(index = EE, columns = Tariff.columns)
-Demand_shifted_percentage = pd.DataFrame(index = EE, columns = Tariff.columns)
+### Results store (system of record of the results), .xlsx copies are only written with export_excel ###
+results_store = os.path.join('..', 'Results Store')
+results_family = 'No Limits/Same Tariff'
+export_excel = False
+
+### Preallocated results (tariff x elasticity x metric), turned into the result tables at export ###
+overall_results = ResultsCube(Tariff.columns, [E], ELASTICITY_TABLES)
+
+### Journal of finished (Tariff, elasticity) scenarios: a restarted run skips them, ###
+### unless the elasticities or tariffs it was written with differ ###
+journal = ScenarioJournal(r'2 Same Tariff Results/Journal.jsonl', {'E': E, 'Tariff': Tariff, 'water_tariff': water_tariff})
 
 ### importing water network model ###
 inp_file = 'Net3.inp'
-wn = wntr.network.WaterNetworkModel(inp_file)
-
-### Setting Simulation Options ###
-wn.options.time.hydraulic_timestep = 3600
-wn.options.time.duration = 82800
-wn.options.time.report_timestep = 3600
-wn.options.energy.global_efficiency = 75
-
-### Removing Controls and Isolating Tanks ###
-for control in wn.control_name_list:
-    wn.remove_control(control)
-wn.get_link('20').status = 'closed' 
-wn.get_link('40').status = 'closed'
-wn.get_link('50').status = 'closed'
-wn.get_link('330').status = 'open'
-wn.get_link('10').status = 'open'
-pump = wn.get_link('10')
-act2 = controls.ControlAction(pump, 'status', 1)
-cond2 = controls.SimTimeCondition(wn, '=', '0:00:00')
-ctrl2 = controls.Control(cond2, act2, name='control2')
-wn.add_control('NewTimeControl', ctrl2)
+wn = load_network(inp_file)
 
 original_demands_df = all_demands(wn)
 
+### Baseline Stage: BAU simulated once, priced under each tariff below ###
+baseline = simulate_baseline(wn)
+
+### Scenarios with unchanged or already simulated demands are filled without simulation ###
+screen = ScenarioScreen(original_demands_df, baseline)
+
 ########################
 ### OVERALL ANALYSIS ###
 ########################
@@ -99,23 +75,19 @@ original_demands_df = all_demands(wn)
 #############################################
 ### Looping over each scenario of Tariffs ###
 
-for T in Tariff.columns:
-    ### Calculating Total Decrease in Tariff for Rebound ###
-    RT = 0
-    for value in water_tariff[T]:
-        if value < water_tariff[T].mean():
-            RT += water_tariff[T].mean() - value
+### throughput and time of each stage of the sweep, summarised in Timing.json ###
+progress = SweepProgress(len(Tariff.columns)*len(E), name = 'Same Tariff sweep')
+stage_timer.reset()
 
+for T in Tariff.columns:
     ##########################################################################
     ### First Part: WNTR Simulation of Network with Existing Demands (BAU) ### 
     
-    ### Simulation ###
-    wn.assign_demand(original_demands_df,pattern_prefix = str(random.random()))
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
+    ### Resetting Original Demands ###
+    assign_pooled_demand(wn,original_demands_df)
     
     ### Calculating Energy and Cost ###
-    pump_energy_original = energy_cost(wn,results,Tariff[T])
+    pump_energy_original = price_energy(baseline,Tariff[T])
     total_hourly_demand_original = total_hourly_demand(wn,water_tariff[T])
     
     original_energy = pump_energy_original['Energy (kWh)'].sum()
@@ -126,62 +98,76 @@ for T in Tariff.columns:
     #####################################################################################################
     ### Second Part: WNTR Simulation of Network Under Different Elasticities with New Demand Patterns ###
     
-    ### Defining response_details dataframe to track shifted demand ###
-    response_details = pd.DataFrame()
-    
-    ### looping over all elasticity values ### 
-    for e in E:
-        
-        ### producing new demand patterns ###  
-        new_demands_df = original_demands_df.copy()
-        for demand in new_demands_df.columns:
-            QT = 0
-            response_details.at[demand,'Demand Before'] = original_demands_df[demand].sum()
-            for hour in new_demands_df.index:
-                if water_tariff.loc[hour,T] > water_tariff[T].mean():
-                    new_demands_df.at[hour,demand] = abs((e)*(water_tariff.loc[hour,T] - water_tariff[T].mean())
-                                                         *(original_demands_df.loc[hour,demand]) - original_demands_df.loc[hour,demand])
-                    QT += abs(original_demands_df.loc[hour,demand] - new_demands_df.loc[hour,demand])       
-            response_details.at[demand,'shifted demand'] = round(QT,3)   
-            response_details.at[demand,'% of demand shifted'] = round((QT*100)/original_demands_df[demand].sum(),2)
-            
-            for hour in new_demands_df.index:
-                if water_tariff.loc[hour,T] < water_tariff[T].mean():
-                    Delta = (QT/RT)*abs(water_tariff[T].mean() - water_tariff.loc[hour,T])
-                    new_demands_df.at[hour,demand] = original_demands_df.loc[hour,demand] + Delta
-            response_details.at[demand,'Demand After'] = new_demands_df[demand].sum()
+    ### producing new demand patterns of all elasticities at once ###
+    shifted_demands, all_response_details = shift_demands_elasticity(original_demands_df,water_tariff[T],E)
+
+    ### looping over all elasticity values ###
+    for i, e in enumerate(E):
+
+        ### elasticities already in the journal are not simulated again ###
+        if (T, e) in journal:
+            if journal[(T, e)] is not None:
+                overall_results[T, e] = journal[(T, e)]
+            progress.update(skipped = True)
+            continue
+
+        ### the scenario's stage times are kept as its row of Timing.json ###
+        with stage_timer.scenario((T, e)):
+
+            ### new demand patterns and shifted demand of elasticity e ###
+            new_demands_df = pd.DataFrame(shifted_demands[i],index = original_demands_df.index,columns = original_demands_df.columns)
+            response_details = all_response_details.loc[e]
             
-        ### Assigning new demands to WDS and checking the success of the operation ###
-        wn.assign_demand(new_demands_df,pattern_prefix = str(random.random()))
-        altered_demand = all_demands(wn)  
+            ### Assigning new demands to WDS and checking the success of the operation ###
+            assign_pooled_demand(wn,new_demands_df)
+            altered_demand = all_demands(wn)  
         
-        ### Simulation ###
-        sim = wntr.sim.EpanetSimulator(wn)
-        results_sim = sim.run_sim()
+            ### Simulation, only the pump flows and heads decoded from the output, unless the screen finds ###
+            ### the demands unchanged or already simulated ###
+            energy = screen.screen((T, e), new_demands_df)
+            screened = energy is not None
+            if not screened:
+                pump_flowrate, head = run_epanet_pumps(wn)
+                energy = hydraulics_energy(wn,pump_flowrate,head)
+                screen.record((T, e),new_demands_df,energy)
         
-        ### Calculating Energy and Cost ###
-        pump_energy = energy_cost(wn,results_sim,Tariff[T])
-        total_hourly_demand_new = total_hourly_demand(wn,water_tariff[T])
+            ### Calculating Energy and Cost ###
+            pump_energy = price_energy(energy,Tariff[T])
+            total_hourly_demand_new = total_hourly_demand(wn,water_tariff[T])
         
-        new_energy = pump_energy['Energy (kWh)'].sum()
-        new_cost = pump_energy['Cost'].sum()
-        new_revenue = total_hourly_demand_new["Revenue ($)"].sum()
-        new_net = new_revenue - new_cost
-        ###
-        energy_savings_percentage.at[e,T] = round((new_energy - original_energy)*100/original_energy ,2)
-        cost_savings_percentage.at[e,T] = round((original_cost - new_cost)*100/original_cost,2)
-        revenue_increase_percentage.at[e,T] = round((new_revenue - original_revenue)*100/original_revenue,2)
-        net_increase_percentage.at[e,T] = round((new_net - original_net)*100/abs(original_net),2)
-        total_demand_difference.at[e,T] = round(response_details['Demand Before'].sum() - response_details['Demand After'].sum(),4)
-        Demand_shifted_percentage.at[e,T] = round(response_details['shifted demand'].sum() * 100 / response_details['Demand Before'].sum(),2)
+            new_energy = pump_energy['Energy (kWh)'].sum()
+            new_cost = pump_energy['Cost'].sum()
+            new_revenue = total_hourly_demand_new["Revenue ($)"].sum()
+            new_net = new_revenue - new_cost
+            ###
+            overall_results[T, e] = [round((new_energy - original_energy)*100/original_energy ,2),
+                                     round((original_cost - new_cost)*100/original_cost,2),
+                                     round((new_revenue - original_revenue)*100/original_revenue,2),
+                                     round((new_net - original_net)*100/abs(original_net),2),
+                                     round(response_details['Demand Before'].sum() - response_details['Demand After'].sum(),4),
+                                     round(response_details['shifted demand'].sum() * 100 / response_details['Demand Before'].sum(),2)]
+            journal.record((T, e), overall_results[T, e])
+            progress.update(skipped = screened)
+
+write_summary(r'2 Same Tariff Results/Timing.json', progress, serial = True, screen = screen.stats())
 
 water_tariff.to_excel(r'2 Same Tariff Results/0.Water Tariffs.xlsx',header = True)     
-energy_savings_percentage.to_excel(r'2 Same Tariff Results/1.Energy Savings Percentage.xlsx',header = True)
-cost_savings_percentage.to_excel(r'2 Same Tariff Results/2.Cost Savings Percentage.xlsx',header = True)
-revenue_increase_percentage.to_excel(r'2 Same Tariff Results/3.Revenue Increase Percentage.xlsx',header = True)
-net_increase_percentage.to_excel(r'2 Same Tariff Results/4.Net Increase Percentage.xlsx',header = True)
-total_demand_difference.to_excel(r'2 Same Tariff Results/5.Total Demand Difference.xlsx',header = True)
-Demand_shifted_percentage.to_excel(r'2 Same Tariff Results/6.Demand Shifted Percentage.xlsx',header = True)  
+overall_tables = overall_results.tables()
+energy_savings_percentage = overall_tables['Energy Savings Percentage']
+cost_savings_percentage = overall_tables['Cost Savings Percentage']
+revenue_increase_percentage = overall_tables['Revenue Increase Percentage']
+net_increase_percentage = overall_tables['Net Increase Percentage']
+total_demand_difference = overall_tables['Total Demand Difference']
+Demand_shifted_percentage = overall_tables['Demand Shifted Percentage']
+write_results(results_store, results_family, overall_tables)
+if export_excel:
+    energy_savings_percentage.to_excel(r'2 Same Tariff Results/1.Energy Savings Percentage.xlsx',header = True)
+    cost_savings_percentage.to_excel(r'2 Same Tariff Results/2.Cost Savings Percentage.xlsx',header = True)
+    revenue_increase_percentage.to_excel(r'2 Same Tariff Results/3.Revenue Increase Percentage.xlsx',header = True)
+    net_increase_percentage.to_excel(r'2 Same Tariff Results/4.Net Increase Percentage.xlsx',header = True)
+    total_demand_difference.to_excel(r'2 Same Tariff Results/5.Total Demand Difference.xlsx',header = True)
+    Demand_shifted_percentage.to_excel(r'2 Same Tariff Results/6.Demand Shifted Percentage.xlsx',header = True)
+journal.remove()
 
 #########################
 ### SPECIFIC ANALYSIS ###
@@ -206,23 +192,15 @@ summary = pd.DataFrame( index = ['value'])
 hourly_results['Energy Tariff'] = Tariff[T]
 hourly_results['Water Tariff'] = water_tariff[T]
 
-### Calculating Total Decrease in Tariff for Rebound ###
-RT = 0
-for value in water_tariff[T]:
-    if value < water_tariff[T].mean():
-        RT += water_tariff[T].mean() - value
-
 ##########################################################################
 ### First Part: WNTR Simulation of Network with Existing Demands (BAU) ### 
 
-### Simulation ###
-wn.assign_demand(original_demands_df,pattern_prefix = str(random.random()))
-sim = wntr.sim.EpanetSimulator(wn)
-results = sim.run_sim()
+### Resetting Original Demands ###
+assign_pooled_demand(wn,original_demands_df)
 original_demands_df.to_excel(writer1,sheet_name='original') 
 
 ### Calculating Energy and Cost ###
-pump_energy_original = energy_cost(wn,results,Tariff[T])
+pump_energy_original = price_energy(baseline,Tariff[T])
 total_hourly_demand_original = total_hourly_demand(wn,water_tariff[T])
 
 original_energy = pump_energy_original['Energy (kWh)'].sum()
@@ -239,35 +217,17 @@ hourly_results['Original Net'] = hourly_results['Original Revenue'] - hourly_res
 #####################################################################################################
 ### Second Part: WNTR Simulation of Network Under Different Elasticities with New Demand Patterns ###
 
-### Defining response_details dataframe to track shifted demand ###
-response_details = pd.DataFrame()
-
-### producing new demand patterns ###  
-new_demands_df = original_demands_df.copy()
-for demand in new_demands_df.columns:
-    QT = 0
-    response_details.at[demand,'Demand Before'] = original_demands_df[demand].sum()
-    for hour in new_demands_df.index:
-        if water_tariff.loc[hour,T] > water_tariff[T].mean():
-            new_demands_df.at[hour,demand] = abs((e)*(water_tariff.loc[hour,T] - water_tariff[T].mean())
-                                                 *(original_demands_df.loc[hour,demand]) - original_demands_df.loc[hour,demand])
-            QT += abs(original_demands_df.loc[hour,demand] - new_demands_df.loc[hour,demand])       
-    response_details.at[demand,'shifted demand'] = round(QT,3)   
-    response_details.at[demand,'% of demand shifted'] = round((QT*100)/original_demands_df[demand].sum(),2)
-    
-    for hour in new_demands_df.index:
-        if water_tariff.loc[hour,T] < water_tariff[T].mean():
-            Delta = (QT/RT)*abs(water_tariff[T].mean() - water_tariff.loc[hour,T])
-            new_demands_df.at[hour,demand] = original_demands_df.loc[hour,demand] + Delta
-    response_details.at[demand,'Demand After'] = new_demands_df[demand].sum()
+### producing new demand patterns and tracking shifted demand ###
+shifted_demands, all_response_details = shift_demands_elasticity(original_demands_df,water_tariff[T],[e])
+new_demands_df = pd.DataFrame(shifted_demands[0],index = original_demands_df.index,columns = original_demands_df.columns)
+response_details = all_response_details.loc[e]
     
 ### Assigning new demands to WDS and checking the success of the operation ###
-wn.assign_demand(new_demands_df,pattern_prefix = str(random.random()))
+assign_pooled_demand(wn,new_demands_df)
 altered_demand = all_demands(wn) 
 
 ### Simulation ###
-sim = wntr.sim.EpanetSimulator(wn)
-results_sim = sim.run_sim()
+results_sim = run_epanet(wn)
 
 ### Calculating Energy and Cost ###
 pump_energy = energy_cost(wn,results_sim,Tariff[T])
@@ -307,7 +267,9 @@ hourly_results['% Net Difference'] = hourly_results['Net Difference']*100/abs(ho
 writer1.save()
 response_details.to_excel(r'2 Same Tariff Results/B. Response_Details.xlsx', header = True)
 summary.to_excel(r'2 Same Tariff Results/C. Summary.xlsx',header = True)
-hourly_results.to_excel(r'2 Same Tariff Results/D. Hourly Results.xlsx',header = True)
+write_table(results_store, results_family+' Hourly', T, hourly_results)
+if export_excel:
+    hourly_results.to_excel(r'2 Same Tariff Results/D. Hourly Results.xlsx',header = True)
 
 ################
 ### PLOTTING ###
@@ -329,7 +291,7 @@ plotting_columns = ['Flat', 'Symmetric', 'Opposite', 'R 1', 'R 2', 'R 3', 'R 4',
 ### 
 
 
-df = pd.read_excel('2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
+df = read_results(results_store, results_family, ['Cost Savings Percentage'])['Cost Savings Percentage']
 df.columns = plotting_columns
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -413,7 +375,7 @@ plt.close()
 
 ### 3.1 Revenue Decrease Percentages 3D ###
 ### 
-df = pd.read_excel('2 Same Tariff Results/3.Revenue Increase Percentage.xlsx', index_col=0)
+df = read_results(results_store, results_family, ['Revenue Increase Percentage'])['Revenue Increase Percentage']
 df.columns = plotting_columns
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -494,7 +456,7 @@ plt.close()
 
 ### 4.1 Net Increase Percentages 3D ###
 ### 
-df = pd.read_excel('2 Same Tariff Results/4.Net Increase Percentage.xlsx', index_col=0)
+df = read_results(results_store, results_family, ['Net Increase Percentage'])['Net Increase Percentage']
 df.columns = plotting_columns
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -575,7 +537,7 @@ plt.close()
 
 ### 6.1 Demand Shifted Percentages 3D ###
 ### 
-df = pd.read_excel('2 Same Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+df = read_results(results_store, results_family, ['Demand Shifted Percentage'])['Demand Shifted Percentage']
 df.columns = plotting_columns
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -679,7 +641,7 @@ plt.close()
 
 ### D Hourly Results Plots ###
 ### 
-df = pd.read_excel('2 Same Tariff Results/D. Hourly Results.xlsx', index_col=0)
+df = read_table(results_store, results_family+' Hourly', T)
 
 ### D.1 Comparison_Total Demand & Tariff ###
 fig, ax1 = plt.subplots(figsize=(15,10))
@@ -1,23 +1,7 @@
 import pandas as pd
-import wntr
-import wntr.network.controls as controls
 import matplotlib.pyplot as plt
 
-#####################
-##### FUNCTIONS #####
-
-### returns a dataframe with energy consumption and cost ###
-
-
-def energy_cost(wn, results, Ta):
-    pump_flowrate = results.link['flowrate'].loc[:, wn.pump_name_list]
-    head = results.node['head']
-    df = wntr.metrics.pump_energy(pump_flowrate, head, wn)
-    df["Energy (kWh)"] = df.sum(axis=1)
-    df["tariff ($/KWh)"] = Ta
-    df['Cost'] = df["tariff ($/KWh)"] * df["Energy (kWh)"]
-    df = df.round(2)
-    return df
+from wds_sim import load_network, simulate_baseline, price_energy
 
 #########################
 ##### PREREQUISITES #####
@@ -29,39 +13,18 @@ water_tariff = pd.DataFrame(index=Tariff.index, columns=Tariff.columns)
 
 ### importing water network model ###
 inp_file = 'Net3.inp'
-wn = wntr.network.WaterNetworkModel(inp_file)
-
-### Setting Simulation Options ###
-wn.options.time.hydraulic_timestep = 3600
-wn.options.time.duration = 82800
-wn.options.time.report_timestep = 3600
-wn.options.energy.global_efficiency = 75
-
-### Removing Controls and Isolating Tanks ###
-for control in wn.control_name_list:
-    wn.remove_control(control)
-wn.get_link('20').status = 'closed'
-wn.get_link('40').status = 'closed'
-wn.get_link('50').status = 'closed'
-wn.get_link('330').status = 'open'
-wn.get_link('10').status = 'open'
-pump = wn.get_link('10')
-act2 = controls.ControlAction(pump, 'status', 1)
-cond2 = controls.SimTimeCondition(wn, '=', '0:00:00')
-ctrl2 = controls.Control(cond2, act2, name='control2')
-wn.add_control('NewTimeControl', ctrl2)
+wn = load_network(inp_file)
+
+### Baseline Stage: BAU simulated once, priced under each tariff below ###
+baseline = simulate_baseline(wn)
 
 #############################################
 ### Looping over each scenario of Tariffs ###
 
 for T in Tariff.columns:
 
-    ### Simulation ###
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
-
     ### Calculating Energy and Cost ###
-    pump_energy_original = energy_cost(wn, results, Tariff[T])
+    pump_energy_original = price_energy(baseline, Tariff[T])
     sorted_df = pump_energy_original.sort_values(
         ["tariff ($/KWh)", "Cost"], ascending=True)
 
@@ -1,36 +1,21 @@
 import numpy as np
 import pandas as pd
 import wntr
-import wntr.network.controls as controls
-import random
 import os
 import matplotlib.pyplot as plt
 from matplotlib import cm
+import logging
+
+from wds_sim import (load_network, all_demands, simulate_baseline, price_energy, assign_pooled_demand, shift_demands_feedback,
+                     run_feedback_sweep, limit_qmax, PEAK_DEMAND_TABLE, write_results, read_results, write_table,
+                     read_table, run_epanet, ScenarioJournal, feedback_parameters)
+
+### progress of the sweep (scenarios per second, ETA) is logged ###
+logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(message)s')
 
 #####################
 ##### FUNCTIONS #####
 
-### Returns all demands at each node and hour ###
-def all_demands(wn):
-    Index = [0, 3600, 7200, 10800, 14400, 18000, 21600, 25200, 28800, 32400, 36000, 39600, 
-             43200, 46800, 50400, 54000, 57600, 61200, 64800, 68400, 72000, 75600, 79200, 82800]
-    df= pd.DataFrame(index = Index)
-    for name in wn.junction_name_list:
-        junction = wn.get_node(name)
-        lst = [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]
-        for demand in junction.demand_timeseries_list:
-            base = demand.base_value
-            pat = demand.pattern
-            pattern = wn.get_pattern(pat)
-            pattern_multipliers = pattern.multipliers
-            dvs = base*pattern_multipliers
-            lst = np.add(lst,dvs)
-        df[name] = lst    
-    for col in df.columns:
-        if df[col].sum()==0:
-            df = df.drop([col],axis =1)         
-    return df
-
 ### returns series with hourly distribution of total demand in network ###
 def total_hourly_demand(wn):
     df = all_demands(wn)
@@ -58,160 +43,59 @@ step = 0.1
 X = np.arange(step,1.1,step).round(2).tolist() #uptake rate list
 Tariff = pd.read_excel('Tariff.xlsx',index_col=0)
 M = 0.1 #Allowed margin to exceed maximum demand (10% here) 
+margins = np.arange(0,0.55,0.05).round(2).tolist() #margins studied, M included
+
+### Results store (system of record of the results), .xlsx copies are only written with export_excel ###
+results_store = os.path.join('..', 'Results Store')
+export_excel = False
 
 ### importing water network model ###
 inp_file = 'Net3.inp'
-wn = wntr.network.WaterNetworkModel(inp_file)
-
-### Setting Simulation Options ###
-wn.options.time.hydraulic_timestep = 3600
-wn.options.time.duration = 82800
-wn.options.time.report_timestep = 3600
-wn.options.energy.global_efficiency = 75
-
-### Removing Controls and Isolating Tanks ###
-for control in wn.control_name_list:
-    wn.remove_control(control)
-wn.get_link('20').status = 'closed' 
-wn.get_link('40').status = 'closed'
-wn.get_link('50').status = 'closed'
-wn.get_link('330').status = 'open'
-wn.get_link('10').status = 'open'
-pump = wn.get_link('10')
-act2 = controls.ControlAction(pump, 'status', 1)
-cond2 = controls.SimTimeCondition(wn, '=', '0:00:00')
-ctrl2 = controls.Control(cond2, act2, name='control2')
-wn.add_control('NewTimeControl', ctrl2)
+wn = load_network(inp_file)
 
 original_demands_df = all_demands(wn)
 
+### Baseline Stage: BAU simulated once, priced under each tariff below ###
+baseline = simulate_baseline(wn)
+
 ########################
 ### OVERALL ANALYSIS ###
 ########################
 
-#############################################
-### Looping over each scenario of Tariffs ###
-
-for T in Tariff.columns:
-    
-    ### Opening all different results dataframes ##
-    energy_savings_percentage = pd.DataFrame()
-    cost_savings_percentage = pd.DataFrame()
-    total_demand_difference = pd.DataFrame()
-    Demand_shifted_percentage = pd.DataFrame()
-    
-    ##########################################################################
-    ### First Part: WNTR Simulation of Network with Existing Demands (BAU) ### 
-    
-    ### Simulation ###
-    wn.assign_demand(original_demands_df,pattern_prefix = str(random.random()))
-    max_demand = total_hourly_demand(wn).max()
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
-    
-    ### Calculating Energy and Cost ###
-    pump_energy_original = energy_cost(wn,results,Tariff[T])
-    original_energy = pump_energy_original['Energy (kWh)'].sum()
-    original_cost = pump_energy_original['Cost'].sum()
-    
-    ##################################################################################################################
-    ### Second Part: WNTR Simulation of Network Under 12 settings and uptake rates series with new demand patterns ###
-    
-    ### Sorting pump_energy_original dataframe to be used for decision making###
-    sorted_df = pump_energy_original.sort_values(["tariff ($/KWh)","Cost"],ascending = True) 
-    
-    ### Defining response_details dataframe to track shifted demand ###
-    response_details = pd.DataFrame(columns = original_demands_df.columns, 
-                                    index = ['shifted demand','Demand Before','Demand After','% of demand shifted'])
-    
-    ### looping over all 12 settings ###
-    for s in S:
-           
-        ### Utility Decision Making ;determining peak and off-peak hours using the sorted df ###
-        df_off_peak = sorted_df['Cost'].iloc[0:s]
-        off_peak_hours = df_off_peak.index.tolist()
-        df_peak = sorted_df['Cost'].iloc[len(sorted_df)-s:len(sorted_df)]
-        peak_hours = df_peak.index.tolist()
-        
-        ### looping over all values of uptake rate ### 
-        for x in X:
-            ### producing new demand patterns ###  
-            new_demands_df = original_demands_df.copy()
-            for demand in new_demands_df.columns:
-                QT = 0
-                response_details.at[demand,'Demand Before'] = original_demands_df[demand].sum()
-                for hour in new_demands_df.index:
-                    if hour in peak_hours:
-                       Delta = new_demands_df.loc[hour,demand]*x
-                       new_value = new_demands_df.loc[hour,demand]- Delta
-                       new_demands_df.at[hour,demand] = new_value
-                       QT += Delta
-                response_details.at[demand,'shifted demand'] = QT  
-                response_details.at[demand,'% of demand shifted'] = round((QT*100)/original_demands_df[demand].sum(),2)
-                Delta2 = QT/s 
-                for hour in new_demands_df.index:
-                    if hour in off_peak_hours: new_demands_df.at[hour,demand] = new_demands_df.loc[hour,demand]+ Delta2
-                response_details.at[demand,'Demand After'] = new_demands_df[demand].sum()
-                
-            ### Assigning new demands to WDS and checking the success of the operation ###
-            wn.assign_demand(new_demands_df,pattern_prefix = str(random.random()))
-            altered_demand = all_demands(wn)  
-            if total_hourly_demand(wn).max() <= ((1+M)*max_demand):    
-                
-                ### Simulation ###
-                sim = wntr.sim.EpanetSimulator(wn)
-                results_sim = sim.run_sim()
-                
-                ### Calculating Energy and Cost ###
-                pump_energy = energy_cost(wn,results_sim,Tariff[T])
-                new_energy = pump_energy['Energy (kWh)'].sum()
-                new_cost = pump_energy['Cost'].sum()
-                
-                ### Filling out the Dataframes ###
-                scenario = 'S='+str(s)+' X='+str(x)
-                energy_savings_percentage.at[scenario,T] = round((new_energy - original_energy)*100/original_energy ,2)
-                cost_savings_percentage.at[scenario,T] = round((original_cost - new_cost)*100/original_cost,2)
-                total_demand_difference.at[scenario,T] = round(response_details['Demand Before'].sum() - response_details['Demand After'].sum(),1)
-                Demand_shifted_percentage.at[scenario,T] = round(response_details['shifted demand'].sum() * 100 / response_details['Demand Before'].sum(),2)
-            
-            else:
-                scenario = 'S='+str(s)+' X='+str(x)
-                energy_savings_percentage.at[scenario,T] = 0
-                cost_savings_percentage.at[scenario,T] = 0
-                total_demand_difference.at[scenario,T] = 0
-                Demand_shifted_percentage.at[scenario,T] = 0
-                
-    ### export dataframes to excel files ###
-    energy_savings_percentage.to_excel(r'1 No Tariff Results/1.Energy Savings Percentage'+T+'.xlsx',header = True)
-    cost_savings_percentage.to_excel(r'1 No Tariff Results/2.Cost Savings Percentage'+T+'.xlsx',header = True)
-    total_demand_difference.to_excel(r'1 No Tariff Results/3.Total Demand Difference'+T+'.xlsx',header = True)
-    Demand_shifted_percentage.to_excel(r'1 No Tariff Results/4.Demand Shifted Percentage'+T+'.xlsx',header = True)  
-
-
-### Opening all different results dataframes ##
-energy_savings_percentage = pd.DataFrame()
-cost_savings_percentage = pd.DataFrame()
-total_demand_difference = pd.DataFrame()
-Demand_shifted_percentage = pd.DataFrame()
-   
-for T in Tariff.columns:
-    df1 = pd.read_excel('1 No Tariff Results/1.Energy Savings Percentage'+T+'.xlsx',index_col=0)
-    df2 = pd.read_excel('1 No Tariff Results/2.Cost Savings Percentage'+T+'.xlsx',index_col=0)
-    df3 = pd.read_excel('1 No Tariff Results/3.Total Demand Difference'+T+'.xlsx',index_col=0)
-    df4 = pd.read_excel('1 No Tariff Results/4.Demand Shifted Percentage'+T+'.xlsx',index_col=0)
-    energy_savings_percentage[T] = df1[T]
-    cost_savings_percentage[T] = df2[T]
-    total_demand_difference[T] = df3[T]
-    Demand_shifted_percentage[T] = df4[T]
-    os.remove('1 No Tariff Results/1.Energy Savings Percentage'+T+'.xlsx')
-    os.remove('1 No Tariff Results/2.Cost Savings Percentage'+T+'.xlsx')
-    os.remove('1 No Tariff Results/3.Total Demand Difference'+T+'.xlsx')
-    os.remove('1 No Tariff Results/4.Demand Shifted Percentage'+T+'.xlsx')
-    
-energy_savings_percentage.to_excel(r'1 No Tariff Results/1.Energy Savings Percentage.xlsx',header = True)
-cost_savings_percentage.to_excel(r'1 No Tariff Results/2.Cost Savings Percentage.xlsx',header = True)
-total_demand_difference.to_excel(r'1 No Tariff Results/3.Total Demand Difference.xlsx',header = True)
-Demand_shifted_percentage.to_excel(r'1 No Tariff Results/4.Demand Shifted Percentage.xlsx',header = True)
+##############################################################
+### No Limits sweep, shared with 1. No Limits/1. No Tariff ###
+
+### all (Tariff, S, X) scenarios simulated on a pool of workers, hydraulic results read from (and added to) ###
+### the cache of the No Limits sweep, so scenarios it already simulated are not solved again ###
+### finished scenarios are journaled as they complete, so an interrupted run resumes where it stopped ###
+### throughput and the time of each stage are summarised in Timing.json ###
+journal = ScenarioJournal(r'1 No Tariff Results/Journal.jsonl', feedback_parameters(inp_file, Tariff, S, X))
+tables = run_feedback_sweep(inp_file, Tariff, S, X, cache_dir = os.path.join('..', '1. No Limits', 'Hydraulic Cache'),
+                            engine = 'toolkit', journal = journal, timing_file = '1 No Tariff Results/Timing.json')
+
+####################################################################
+### Qmax constraint applied to the sweep for all margins at once ###
+max_demand = total_hourly_demand(wn).max()
+limited = limit_qmax(tables, tables[PEAK_DEMAND_TABLE], max_demand, margins)
+
+energy_savings_percentage = limited[M]['Energy Savings Percentage']
+cost_savings_percentage = limited[M]['Cost Savings Percentage']
+total_demand_difference = limited[M]['Total Demand Difference']
+Demand_shifted_percentage = limited[M]['Demand Shifted Percentage']
+
+write_results(results_store, 'Limited Qmax/No Tariff', limited[M])
+if export_excel:
+    energy_savings_percentage.to_excel(r'1 No Tariff Results/1.Energy Savings Percentage.xlsx',header = True)
+    cost_savings_percentage.to_excel(r'1 No Tariff Results/2.Cost Savings Percentage.xlsx',header = True)
+    total_demand_difference.to_excel(r'1 No Tariff Results/3.Total Demand Difference.xlsx',header = True)
+    Demand_shifted_percentage.to_excel(r'1 No Tariff Results/4.Demand Shifted Percentage.xlsx',header = True)
+journal.remove()
+
+### Margin study: best cost savings of each tariff under every margin ###
+margin_study = pd.DataFrame({m: limited[m]['Cost Savings Percentage'].max() for m in margins}).T
+write_results(results_store, 'Limited Qmax/No Tariff Margins', {'Best Cost Savings Percentage': margin_study})
+if export_excel:
+    margin_study.to_excel(r'1 No Tariff Results/5.Best Cost Savings per Margin.xlsx',header = True)
 
 ##########################
 ### SPECIFIC ANALYSIS ####
@@ -232,10 +116,8 @@ hourly_results['Tariff'] = Ta
 ###########################################################################
 ### First Part: WNTR Simulation and Results with Existing Demands (BAU) ### 
 
-### Simulation ###
-wn.assign_demand(original_demands_df,pattern_prefix = str(random.random()))
-sim = wntr.sim.EpanetSimulator(wn)
-results = sim.run_sim()
+### Resetting Original Demands ###
+assign_pooled_demand(wn,original_demands_df)
 
 ### returning dataframe of original demands and adding it to excel file ###
 original_demands_df = all_demands(wn)
@@ -245,7 +127,7 @@ original_demands_df.to_excel(writer1,sheet_name='original')
 hourly_results['Original Demand'] = total_hourly_demand(wn).round(3)
 
 ### Values of Energy and Cost with original Demand###
-pump_energy_original = energy_cost(wn,results,Ta)
+pump_energy_original = price_energy(baseline,Ta)
 hourly_results['Original Energy Consumption (KWh)'] = pump_energy_original['Energy (kWh)']
 hourly_results['Original Cost'] = pump_energy_original['Cost']
 
@@ -261,35 +143,15 @@ peak_hours = df_peak.index.tolist()
 ################################################################################
 ### Third Part: Producing New Demand Patterns and Simulating Again with WNTR ###
 
-### Defining response_details dataframe to track shifted demand ###
-response_details = pd.DataFrame(index = original_demands_df.columns, 
-                                columns = ['shifted demand','Demand Before','Demand After','% of demand shifted'])
-
-### producing new demand patterns ###  
-new_demands_df = original_demands_df.copy()
-for demand in new_demands_df.columns:
-    QT = 0
-    response_details.at[demand,'Demand Before'] = original_demands_df[demand].sum()
-    for hour in new_demands_df.index:
-        if hour in peak_hours:
-           Delta = new_demands_df.loc[hour,demand]*X
-           new_value = new_demands_df.loc[hour,demand]- Delta
-           new_demands_df.at[hour,demand] = new_value
-           QT += Delta
-    response_details.at[demand, 'shifted demand'] = QT
-    response_details.at[demand, '% of demand shifted'] = round((QT*100)/original_demands_df[demand].sum(),2)
-    Delta2 = QT/S 
-    for hour in new_demands_df.index:
-        if hour in off_peak_hours: new_demands_df.at[hour,demand] = new_demands_df.loc[hour,demand]+ Delta2
-    response_details.at[demand, 'Demand After'] = new_demands_df[demand].sum()
+### producing new demand patterns and tracking shifted demand ###
+new_demands_df, response_details = shift_demands_feedback(original_demands_df,peak_hours,off_peak_hours,S,X)
         
 ### Assigning new demands to WDS###
-wn.assign_demand(new_demands_df,pattern_prefix = 'new')
+assign_pooled_demand(wn,new_demands_df)
 altered_demand = all_demands(wn)
     
 ### Simulation with New Demands ###
-sim = wntr.sim.EpanetSimulator(wn)
-results_sim = sim.run_sim()
+results_sim = run_epanet(wn)
     
 ### Calculating Energy and Cost ###
 pump_energy = energy_cost(wn,results_sim,Ta)
@@ -323,7 +185,9 @@ writer1.save()
 response_details.to_excel(r'1 No Tariff Results/B. Response_Details.xlsx', header = True)
 sorted_df.to_excel(r'1 No Tariff Results/C. Sorted_hours.xlsx',header = True)
 summary.to_excel(r'1 No Tariff Results/D. Summary.xlsx',header = True)
-hourly_results.to_excel(r'1 No Tariff Results/E. Hourly Results.xlsx',header = True)
+write_table(results_store, 'Limited Qmax/No Tariff Hourly', T, hourly_results)
+if export_excel:
+    hourly_results.to_excel(r'1 No Tariff Results/E. Hourly Results.xlsx',header = True)
 
 ################
 ### PLOTTING ###
@@ -347,7 +211,7 @@ plotting_columns = ['Flat', 'Symmetric', 'Opposite', 'R 1', 'R 2', 'R 3', 'R 4',
 
 ### 2.1 Cost Savings Percentages 3D ###
 ### 
-df = pd.read_excel('1 No Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
+df = read_results(results_store, 'Limited Qmax/No Tariff', ['Cost Savings Percentage'])['Cost Savings Percentage']
 
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -428,7 +292,7 @@ plt.close()
 
 ### 4.1 Demand Shifted Percentages 3D ###
 ### 
-df = pd.read_excel('1 No Tariff Results/4.Demand Shifted Percentage.xlsx', index_col=0)
+df = read_results(results_store, 'Limited Qmax/No Tariff', ['Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 df2 = pd.DataFrame(columns = ['x','y','z'])
 j = 0
@@ -536,7 +400,7 @@ plt.close()
 
 ### E Hourly Results Plots ###
 ### 
-df = pd.read_excel('1 No Tariff Results/E. Hourly Results.xlsx', index_col=0)
+df = read_table(results_store, 'Limited Qmax/No Tariff Hourly', T)
 
 ### E.1 Comparison_Total Demand & Tariff ###
 fig, ax1 = plt.subplots(figsize=(15,10))
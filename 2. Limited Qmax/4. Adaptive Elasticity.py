@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import os
+import logging
+
+from wds_sim import (load_network, all_demands, simulate_baseline, ScenarioScreen, ELASTICITY_TABLES, write_results,
+                     refine_grid, elasticity_scenarios, elasticity_metric, SweepProgress, stage_timer, write_summary)
+
+### progress of the sweep (scenarios per second, ETA) is logged ###
+logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(message)s')
+
+#####################################################################################
+### Same Tariff elasticity sweep under the Qmax limit on an adaptive grid: starts  ###
+### from a coarse E, refines where cost savings change quickly or where the scenarios ###
+### become infeasible, within a tolerance and a simulation budget per tariff        ###
+#####################################################################################
+
+#########################
+##### PREREQUISITES #####
+
+### Coarse Elasticities, refinement settings & Tariff ###
+E = [0.05,0.25,0.5,0.75,1.0] #coarse elasticities
+tolerance = 0.5 #largest change of cost savings (%) between neighbouring elasticities
+budget = 12 #simulations per tariff
+min_step = 0.0125 #finest elasticity step
+refined_metric = 'Cost Savings Percentage'
+M = 0.1 #Allowed margin to exceed maximum demand (10% here)
+Tariff = pd.read_excel('Tariff.xlsx',index_col=0)
+water_tariff = Tariff.copy()
+
+### Results store, one row per elasticity sampled for any tariff (NaN where a tariff's grid has no such e) ###
+results_store = os.path.join('..', 'Results Store')
+results_family = 'Limited Qmax/Adaptive Same Tariff'
+os.makedirs('4 Adaptive Elasticity Results', exist_ok = True)
+
+### importing water network model, with the settings of the other scripts ###
+wn = load_network('Net3.inp')
+original_demands_df = all_demands(wn)
+max_demand = original_demands_df.sum(axis = 1).max()
+
+### Baseline Stage: BAU simulated once ###
+baseline = simulate_baseline(wn)
+screen = ScenarioScreen(original_demands_df, baseline)
+
+########################
+### OVERALL ANALYSIS ###
+########################
+
+progress = SweepProgress(len(Tariff.columns)*budget, name = 'Adaptive Same Tariff sweep')
+stage_timer.reset()
+
+overall_results = {}
+for T in Tariff.columns:
+    evaluate, feasible = elasticity_scenarios(wn, original_demands_df, baseline, Tariff[T], water_tariff[T],
+                                              max_peak = (1+M)*max_demand, screen = screen, name = T)
+    overall_results[T], simulations = refine_grid(evaluate, E, tolerance, budget, min_step, feasible,
+                                                  elasticity_metric(refined_metric))
+    progress.update(simulations)
+    progress.update(budget - simulations, skipped = True)
+
+write_summary(r'4 Adaptive Elasticity Results/Timing.json', progress, serial = True, screen = screen.stats())
+
+### Result tables over all elasticities sampled, infeasible scenarios left NaN like the Limited Same and Our Tariff sweeps ###
+E_all = sorted(set(e for results in overall_results.values() for e in results))
+overall_tables = {}
+for k, name in enumerate(ELASTICITY_TABLES):
+    table = pd.DataFrame(np.nan, index = E_all, columns = Tariff.columns)
+    for T, results in overall_results.items():
+        for e, result in results.items():
+            if result is not None:
+                table.loc[e, T] = result[k]
+    overall_tables[name] = table
+write_results(results_store, results_family, overall_tables)
+overall_tables[refined_metric].to_excel(r'4 Adaptive Elasticity Results/2.Cost Savings Percentage.xlsx',header = True)
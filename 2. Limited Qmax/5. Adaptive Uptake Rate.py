@@ -0,0 +1,42 @@
+import pandas as pd
+import os
+import logging
+
+from wds_sim import run_adaptive_feedback_sweep, write_results
+
+### progress of the sweep (scenarios per second, ETA) is logged ###
+logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(message)s')
+
+#####################################################################################
+### No Tariff (feedback) sweep under the Qmax limit on adaptive uptake-rate grids: ###
+### each (Tariff, S) pair starts from a coarse X, refined where cost savings change ###
+### quickly or where the scenarios become infeasible, within a tolerance and a      ###
+### simulation budget per pair                                                      ###
+#####################################################################################
+
+#########################
+##### PREREQUISITES #####
+
+### Design Settings, Coarse Uptake Rates, refinement settings & Tariff ###
+S = [1,2,3,4,5,6,7,8,9,10,11,12] #all available settings
+X = [0.1,0.4,0.7,1.0] #coarse uptake rates
+tolerance = 0.5 #largest change of cost savings (%) between neighbouring uptake rates
+budget = 8 #simulations per (Tariff, S) pair
+min_step = 0.025 #finest uptake rate step
+refined_metric = 'Cost Savings Percentage'
+M = 0.1 #Allowed margin to exceed maximum demand (10% here)
+Tariff = pd.read_excel('Tariff.xlsx',index_col=0)
+
+### Results store, one row per (S, X) sampled for any tariff (NaN where a pair's grid has no such X or it is infeasible) ###
+results_store = os.path.join('..', 'Results Store')
+results_family = 'Limited Qmax/Adaptive No Tariff'
+os.makedirs('5 Adaptive Uptake Rate Results', exist_ok = True)
+
+########################
+### OVERALL ANALYSIS ###
+########################
+
+overall_tables = run_adaptive_feedback_sweep('Net3.inp', Tariff, S, X, tolerance, budget, min_step, refined_metric, M,
+                                             timing_file = r'5 Adaptive Uptake Rate Results/Timing.json')
+write_results(results_store, results_family, overall_tables)
+overall_tables[refined_metric].to_excel(r'5 Adaptive Uptake Rate Results/2.Cost Savings Percentage.xlsx',header = True)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import sys
+import logging
+
+from wds_sim import make_feedback_golden, make_elasticity_golden, check_feedback_engine, check_stored_results
+
+#################################################################################
+### Equivalence of the faster engines with the EpanetSimulator path: golden  ###
+### result tables of the feedback sweep, each engine checked scenario by scenario ###
+### and the stored results of the elasticity scripts checked the same way     ###
+#################################################################################
+### python "Check Engines.py"                          checks every engine (golden made on the first run) ###
+### python "Check Engines.py" --engines toolkit --tariffs Flat Symmetric --remake ###
+### python "Check Engines.py" --engines --scripts "Limited Qmax/Same Tariff"    checks only that script's stored results ###
+### the golden results come from the slow reference path of the original scripts (minutes for the feedback grid) ###
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--engines', nargs = '*', default = ['epanet', 'toolkit', 'packed', 'snapshot', 'groups'])
+parser.add_argument('--tariffs', nargs = '+', default = None, help = 'tariffs of the golden results (default all)')
+parser.add_argument('--golden', default = 'Golden Feedback.npz', help = 'golden results file, kept in this folder')
+parser.add_argument('--scripts', nargs = '*', default = None,
+                    help = 'results families of the elasticity scripts to check (default all, with results in the store)')
+parser.add_argument('--remake', action = 'store_true', help = 'remake the golden results with the reference sweep')
+parser.add_argument('--tolerance', action = 'append', nargs = 2, metavar = ('METRIC', 'ATOL'), default = None,
+                    help = 'absolute tolerance of a metric, e.g. --tolerance "Cost Savings Percentage" 0.02')
+parser.add_argument('--processes', type = int, default = None)
+args = parser.parse_args()
+
+### Paths from the script's folder, so it runs from any directory: golden files and diff reports are kept there ###
+benchmarks = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(benchmarks, '..')
+golden = os.path.join(benchmarks, args.golden)
+
+logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(message)s')
+
+### Same inputs as the No Tariff sweeps ###
+inp_file = os.path.join(root, 'Net3.inp')
+Tariff = pd.read_excel(os.path.join(root, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)
+if args.tariffs is not None:
+    Tariff = Tariff[args.tariffs]
+S = [1,2,3,4,5,6,7,8,9,10,11,12]
+X = [0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0]
+tolerances = {metric: float(atol) for metric, atol in args.tolerance} if args.tolerance else None
+
+### Golden results from the reference (EpanetSimulator) sweep ###
+if args.engines and (args.remake or not os.path.exists(golden)):
+    make_feedback_golden(golden, inp_file, Tariff, S, X)
+    print('golden results saved to '+golden)
+
+### Each engine against the golden results, the diff report of a failing engine saved as csv ###
+failed = []
+for engine in args.engines:
+    report = check_feedback_engine(golden, inp_file, Tariff, S, X, engine, tolerances, processes = args.processes)
+    if report.empty:
+        print(engine+': identical to the golden results within tolerance')
+        continue
+    failed.append(engine)
+    report.to_csv(os.path.join(benchmarks, 'Engine Diff '+engine+'.csv'), index = False)
+    print(engine+': '+str(len(report))+' values outside tolerance in '+str(report['scenario'].nunique())+' scenarios')
+    print(report.sort_values('difference', ascending = False).head(10).to_string(index = False))
+
+### Stored results of the elasticity scripts: (folder, water tariff file or None for the energy tariff, M) per family ###
+results_store = os.path.join(root, 'Results Store')
+E = np.arange(0.05, 1.05, 0.05).round(2).tolist()
+scripts = {'No Limits/Same Tariff': ('1. No Limits', None, None),
+           'No Limits/Our Tariff': ('1. No Limits', os.path.join('3 Our Tariff Results', '0.Water Tariffs.xlsx'), None),
+           'Limited Qmax/Same Tariff': ('2. Limited Qmax', None, 0.1),
+           'Limited Qmax/Our Tariff': ('2. Limited Qmax', os.path.join('3 Our Tariff Results', '0.Water Tariffs.xlsx'), 0.1)}
+for family in (args.scripts if args.scripts is not None else scripts):
+    folder, water_file, M = scripts[family]
+    if not os.path.exists(os.path.join(results_store, *family.split('/'))):
+        print(family+': no results in the store, run the script first')
+        continue
+    golden_file = os.path.join(benchmarks, 'Golden '+family.replace('/', ' ')+'.npz')
+    if args.remake or not os.path.exists(golden_file):
+        script_tariff = pd.read_excel(os.path.join(root, folder, 'Tariff.xlsx'), index_col = 0)
+        if args.tariffs is not None:
+            script_tariff = script_tariff[args.tariffs]
+        water_tariff = (pd.read_excel(os.path.join(root, folder, water_file), index_col = 0) if water_file is not None
+                        else script_tariff.copy())
+        make_elasticity_golden(golden_file, os.path.join(root, folder, 'Net3.inp'), script_tariff, water_tariff, E, M)
+        print('golden results saved to '+golden_file)
+    report = check_stored_results(golden_file, results_store, family, tolerances)
+    if report.empty:
+        print(family+': identical to the golden results within tolerance')
+        continue
+    failed.append(family)
+    report.to_csv(os.path.join(benchmarks, 'Script Diff '+family.replace('/', ' ')+'.csv'), index = False)
+    print(family+': '+str(len(report))+' values outside tolerance in '+str(report['scenario'].nunique())+' scenarios')
+    print(report.sort_values('difference', ascending = False).head(10).to_string(index = False))
+
+if failed:
+    sys.exit(1)
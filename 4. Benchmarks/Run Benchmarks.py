@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import sys
+import tempfile
+
+from wds_sim import (HOURS, load_network, all_demands, assign_pooled_demand, shift_demands_elasticity,
+                     shift_demands_feedback_batch, run_epanet, energy_cost, run_feedback_sweep)
+from wds_sim.benchmark import run_suite, save_baseline, load_baseline, compare
+
+##########################################################################
+### Benchmarks of the sweep hot paths on Net3: time (best of repeats), ###
+### peak memory and scenarios per second, checked against a baseline  ###
+##########################################################################
+### python "Run Benchmarks.py"                 compares with Baseline.json (saved on the first run) ###
+### python "Run Benchmarks.py" --save          saves the results as the new baseline ###
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--save', action = 'store_true', help = 'save the results as the new baseline')
+parser.add_argument('--repeat', type = int, default = 5, help = 'timed runs per benchmark (the best is kept)')
+parser.add_argument('--tolerance', type = float, default = 0.25, help = 'allowed relative slow-down')
+parser.add_argument('--memory-tolerance', type = float, default = 0.25, help = 'allowed relative peak memory increase')
+parser.add_argument('--baseline', default = 'Baseline.json')
+args = parser.parse_args()
+
+### Fixed inputs: the bundled network and seeded tariffs ###
+inp_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Net3.inp')
+seed = 2021
+rng = np.random.default_rng(seed)
+water_tariff = pd.Series(rng.uniform(0.5, 1.5, len(HOURS)), index = HOURS)
+Tariff = pd.DataFrame({'Benchmark': rng.uniform(0.5, 1.5, len(HOURS))}, index = HOURS)
+S = [1,2,3,4,5,6,7,8,9,10,11,12]
+X = np.arange(0.1,1.1,0.1).round(2).tolist()
+E = np.arange(0.05,1.05,0.05).round(2).tolist()
+peak = np.zeros(len(HOURS), dtype = bool)
+peak[7:11] = True
+off_peak = np.zeros(len(HOURS), dtype = bool)
+off_peak[0:4] = True
+
+### EPANET files of the benchmarks go to a scratch directory ###
+scratch = tempfile.TemporaryDirectory()
+file_prefix = os.path.join(scratch.name, 'benchmark')
+
+#########################################################################
+### Benchmarks: setup returns (function timed, scenarios per call) ###
+
+### demand extraction from the patterns ###
+def bench_all_demands():
+    wn = load_network(inp_file)
+    return (lambda: all_demands(wn)), 1
+
+### elasticity transform of all elasticities of one tariff ###
+def bench_elasticity_transform():
+    original_demands_df = all_demands(load_network(inp_file))
+    return (lambda: shift_demands_elasticity(original_demands_df, water_tariff, E)), len(E)
+
+### feedback transform of all uptake rates of one (T, S) pair ###
+def bench_feedback_transform():
+    original_demands_df = all_demands(load_network(inp_file))
+    return (lambda: shift_demands_feedback_batch(original_demands_df, peak, off_peak, 4, X)), len(X)
+
+### pump energy and cost of one simulated scenario ###
+def bench_energy_cost():
+    wn = load_network(inp_file)
+    results = run_epanet(wn, file_prefix)
+    return (lambda: energy_cost(wn, results, Tariff['Benchmark'])), 1
+
+### one scenario: assigning demands and a full EPANET run ###
+def bench_epanet_run():
+    wn = load_network(inp_file)
+    original_demands_df = all_demands(wn)
+    def run():
+        assign_pooled_demand(wn, original_demands_df)
+        run_epanet(wn, file_prefix)
+    return run, 1
+
+### the complete (S x X) sweep of one tariff, serial, without cache ###
+def bench_one_tariff_sweep():
+    def run():
+        cwd = os.getcwd()
+        os.chdir(scratch.name)
+        try:
+            run_feedback_sweep(inp_file, Tariff, S, X, processes = 1)
+        finally:
+            os.chdir(cwd)
+    return run, len(S)*len(X)
+
+suite = {'all_demands': bench_all_demands,
+         'elasticity transform': bench_elasticity_transform,
+         'feedback transform': bench_feedback_transform,
+         'energy_cost': bench_energy_cost,
+         'EPANET run': bench_epanet_run,
+         'one-tariff sweep': bench_one_tariff_sweep}
+
+#####################################
+### Running and checking baseline ###
+repeats = {'one-tariff sweep': 1}
+results = {}
+for name, setup in suite.items():
+    results.update(run_suite({name: setup}, repeat = repeats.get(name, args.repeat)))
+scratch.cleanup()
+
+if args.save or not os.path.exists(args.baseline):
+    save_baseline(args.baseline, results)
+    print('baseline saved to '+args.baseline)
+    sys.exit(0)
+
+regressions = compare(results, load_baseline(args.baseline), args.tolerance, args.memory_tolerance)
+for regression in regressions:
+    print('REGRESSION '+regression)
+if regressions:
+    sys.exit(1)
+print('no regression against '+args.baseline)
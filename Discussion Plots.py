@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import wntr
+from wds_sim import read_results
 
 
 def autolabel(rects):
@@ -39,14 +40,17 @@ inp_file = 'Net3.inp'
 wn = wntr.network.WaterNetworkModel(inp_file)
 plt.style.use('seaborn')
 
+### results store written by the scenario scripts ###
+results_store = 'Results Store'
+
 
 ######################
 ### S,X,E Analyses ###
 cost1 = pd.read_excel('3. Discussion Plots/1.1 Analyses.xlsx', index_col=0)
-cost2 = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-cost3 = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
+cost2 = read_results(results_store, 'No Limits/Same Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+cost3 = read_results(results_store, 'No Limits/Our Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
 
 ### Scenario 1.1###
 
@@ -156,18 +160,18 @@ plt.savefig('3. Discussion Plots/3_e_Cost Savings.png')
 ########################################
 ### Demand Shifted and Cost Analyses ###
 
-cost1 = pd.read_excel(
-    '2. Limited Qmax/1 No Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-cost2 = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-cost3 = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-demand1 = pd.read_excel(
-    '2. Limited Qmax/1 No Tariff Results/4.Demand Shifted Percentage.xlsx', index_col=0)
-demand2 = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
-demand3 = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+cost1 = read_results(results_store, 'Limited Qmax/No Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+cost2 = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+cost3 = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+demand1 = read_results(results_store, 'Limited Qmax/No Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
+demand2 = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
+demand3 = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 df = pd.DataFrame(index=cost1.columns)
 df['maxcost 1'] = cost1.max(axis=0).round(2)
@@ -248,12 +252,12 @@ plt.savefig('3. Discussion Plots/3.2_Costs_demands.png')
 ################################
 ### Pie Charts, Cost Savings ###
 
-cost1 = pd.read_excel(
-    '1. No Limits/1 No Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-cost2 = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-cost3 = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
+cost1 = read_results(results_store, 'No Limits/No Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+cost2 = read_results(results_store, 'No Limits/Same Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+cost3 = read_results(results_store, 'No Limits/Our Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
 
 # Scenario 1.1
 
@@ -411,56 +415,56 @@ for j in wn.junction_name_list:
 ### Symmetric Analysis ###
 
 ## No Limit SX ##
-no_limit_SX_cost = pd.read_excel(
-    '1. No Limits/1 No Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-no_limit_SX_demand = pd.read_excel(
-    '1. No Limits/1 No Tariff Results/4.Demand Shifted Percentage.xlsx', index_col=0)
+no_limit_SX_cost = read_results(results_store, 'No Limits/No Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+no_limit_SX_demand = read_results(results_store, 'No Limits/No Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 ## Limited SX ##
-limit_SX_cost = pd.read_excel(
-    '2. Limited Qmax/1 No Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-limit_SX_demand = pd.read_excel(
-    '2. Limited Qmax/1 No Tariff Results/4.Demand Shifted Percentage.xlsx', index_col=0)
+limit_SX_cost = read_results(results_store, 'Limited Qmax/No Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+limit_SX_demand = read_results(results_store, 'Limited Qmax/No Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 ## No Limit Same Tariff ##
-no_limit_ST_cost = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-no_limit_ST_revenue = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/3.Revenue Increase Percentage.xlsx', index_col=0)
-no_limit_ST_net = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/4.Net Increase Percentage.xlsx', index_col=0)
-no_limit_ST_demand = pd.read_excel(
-    '1. No Limits/2 Same Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+no_limit_ST_cost = read_results(results_store, 'No Limits/Same Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+no_limit_ST_revenue = read_results(results_store, 'No Limits/Same Tariff', [
+    'Revenue Increase Percentage'])['Revenue Increase Percentage']
+no_limit_ST_net = read_results(results_store, 'No Limits/Same Tariff', [
+    'Net Increase Percentage'])['Net Increase Percentage']
+no_limit_ST_demand = read_results(results_store, 'No Limits/Same Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 ## limited Same Tariff ##
-limit_ST_cost = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-limit_ST_revenue = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/3.Revenue Increase Percentage.xlsx', index_col=0)
-limit_ST_net = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/4.Net Increase Percentage.xlsx', index_col=0)
-limit_ST_demand = pd.read_excel(
-    '2. Limited Qmax/2 Same Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+limit_ST_cost = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+limit_ST_revenue = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Revenue Increase Percentage'])['Revenue Increase Percentage']
+limit_ST_net = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Net Increase Percentage'])['Net Increase Percentage']
+limit_ST_demand = read_results(results_store, 'Limited Qmax/Same Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 ## No Limit Our Tariff ##
-no_limit_OT_cost = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-no_limit_OT_revenue = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/3.Revenue Increase Percentage.xlsx', index_col=0)
-no_limit_OT_net = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/4.Net Increase Percentage.xlsx', index_col=0)
-no_limit_OT_demand = pd.read_excel(
-    '1. No Limits/3 Our Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+no_limit_OT_cost = read_results(results_store, 'No Limits/Our Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+no_limit_OT_revenue = read_results(results_store, 'No Limits/Our Tariff', [
+    'Revenue Increase Percentage'])['Revenue Increase Percentage']
+no_limit_OT_net = read_results(results_store, 'No Limits/Our Tariff', [
+    'Net Increase Percentage'])['Net Increase Percentage']
+no_limit_OT_demand = read_results(results_store, 'No Limits/Our Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 ## limited Our Tariff ##
-limit_OT_cost = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/2.Cost Savings Percentage.xlsx', index_col=0)
-limit_OT_revenue = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/3.Revenue Increase Percentage.xlsx', index_col=0)
-limit_OT_net = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/4.Net Increase Percentage.xlsx', index_col=0)
-limit_OT_demand = pd.read_excel(
-    '2. Limited Qmax/3 Our Tariff Results/6.Demand Shifted Percentage.xlsx', index_col=0)
+limit_OT_cost = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Cost Savings Percentage'])['Cost Savings Percentage']
+limit_OT_revenue = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Revenue Increase Percentage'])['Revenue Increase Percentage']
+limit_OT_net = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Net Increase Percentage'])['Net Increase Percentage']
+limit_OT_demand = read_results(results_store, 'Limited Qmax/Our Tariff', [
+    'Demand Shifted Percentage'])['Demand Shifted Percentage']
 
 
 plt.style.use('seaborn')
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import refine_grid, run_adaptive_feedback_sweep, run_feedback_sweep, FEEDBACK_TABLES, PEAK_DEMAND_TABLE
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+
+### Infeasible values are never evaluated and come back as None; the boundary interval is bisected first ###
+def test_refine_grid_skips_infeasible_values():
+    evaluated = []
+    def evaluate(value):
+        evaluated.append(value)
+        return value**2
+    results, simulations = refine_grid(evaluate, [0.0, 0.5, 1.0], tolerance = 10, budget = 6,
+                                       feasible = lambda value: value <= 0.55)
+    assert simulations == len(evaluated) == 6
+    assert all(value <= 0.55 for value in evaluated)
+    assert list(results) == sorted(results)
+    assert all((result is None) == (value > 0.55) for value, result in results.items())
+    assert all(results[value] == value**2 for value in evaluated)
+    ### the budget went on the boundary: the largest feasible value lies within 0.5/2**4 of it ###
+    assert 0.55 - max(evaluated) < 0.5/2**4
+
+### Within tolerance nothing is refined, and without feasible every value is simulated ###
+def test_refine_grid_within_tolerance():
+    results, simulations = refine_grid(lambda value: value, [0.0, 0.5, 1.0], tolerance = 1)
+    assert results == {0.0: 0.0, 0.5: 0.5, 1.0: 1.0}
+    assert simulations == 3
+
+### Under Limited Qmax the uptake rates beyond the boundary stay NaN in every table, the feasible ones match the sweep ###
+def test_adaptive_feedback_sweep_leaves_infeasible_cells_nan():
+    tariff = pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)[['Symmetric']]
+    M = 0.5
+    tables = run_adaptive_feedback_sweep(INP_FILE, tariff, [8], [0.0, 0.5, 1.0], tolerance = 100, budget = 6, M = M,
+                                         processes = 1)
+    peak = tables[PEAK_DEMAND_TABLE]['Symmetric']
+    assert peak.notna()['S=8 X=0.0'] and peak.isna()['S=8 X=1.0']
+    assert (peak.dropna() <= (1+M)*peak['S=8 X=0.0']).all()
+    x = np.array([float(label.split('X=')[1]) for label in peak.index])
+    assert x[peak.notna().values].max() < x[peak.isna().values].min()
+    for name in FEEDBACK_TABLES:
+        pd.testing.assert_series_equal(tables[name]['Symmetric'].isna(), peak.isna(), check_names = False)
+
+    reference = run_feedback_sweep(INP_FILE, tariff, [8], [0.0, 0.5], processes = 1)
+    for name in FEEDBACK_TABLES + [PEAK_DEMAND_TABLE]:
+        np.testing.assert_allclose(tables[name].loc[reference[name].index].values, reference[name].values, atol = 1e-9)
@@ -0,0 +1,27 @@
+from wds_sim.benchmark import run_benchmark, compare, save_baseline, load_baseline
+
+BASELINE = {'benchmarks': {'solve': {'seconds': 0.010, 'peak_memory_bytes': 1000},
+                           'parse': {'seconds': 0.002, 'peak_memory_bytes': 0}}}
+
+### Time or peak memory beyond the baseline's tolerance is a regression; new benchmarks and untraced peaks are not ###
+def test_compare_flags_regressions():
+    results = {'solve': {'seconds': 0.012, 'peak_memory_bytes': 1300},
+               'parse': {'seconds': 0.003, 'peak_memory_bytes': 500},
+               'new': {'seconds': 1.0, 'peak_memory_bytes': 10**9}}
+    regressions = compare(results, BASELINE)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('solve:') and 'MiB' in regressions[0]
+    assert regressions[1].startswith('parse:') and 'ms' in regressions[1]
+    assert compare(results, BASELINE, tolerance = 1.0, memory_tolerance = 0.5) == []
+
+def test_run_benchmark_and_baseline(tmp_path):
+    def setup():
+        return (lambda: sum(range(1000))), 4
+    result = run_benchmark(setup, repeat = 2)
+    assert result['seconds'] > 0
+    assert result['scenarios_per_second'] == 4/result['seconds']
+    path = tmp_path/'baseline.json'
+    save_baseline(path, {'sum': result})
+    baseline = load_baseline(path)
+    assert baseline['benchmarks']['sum'] == result
+    assert compare({'sum': result}, baseline) == []
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import load_network, all_demands, HydraulicCache
+
+INP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Net3.inp')
+
+### The key changes with the status of a pipe, not only with the pumps' ###
+def test_key_covers_link_statuses(tmp_path):
+    wn = load_network(INP_FILE)
+    demands_df = all_demands(wn)
+    cache = HydraulicCache(str(tmp_path))
+    key = cache.key(wn, demands_df)
+    wn.get_link('20').initial_status = 'open'
+    assert cache.key(wn, demands_df) != key
+
+### Caches of several processes sharing a directory keep the whole directory within max_bytes ###
+def test_eviction_bound_is_shared(tmp_path):
+    index = list(range(24))
+    pump_flowrate = pd.DataFrame(np.random.default_rng(0).random((24, 2)), index = index, columns = ['10', '335'])
+    head = pd.DataFrame(np.random.default_rng(1).random((24, 4)), index = index, columns = ['10', '60', '61', '335'])
+    probe = HydraulicCache(str(tmp_path / 'probe'))
+    probe.store('probe', pump_flowrate, head)
+    entry_bytes = probe.stats()['bytes']
+    max_bytes = 10*entry_bytes
+    caches = [HydraulicCache(str(tmp_path / 'shared'), max_bytes, rescan_every = 4) for _ in range(3)]
+    for k in range(60):
+        caches[k % 3].store('entry'+str(k), pump_flowrate, head)
+    total = sum(entry.stat().st_size for entry in os.scandir(str(tmp_path / 'shared')))
+    ### entries stored by the other caches since a cache's last rescan may exceed the bound until its next rescan ###
+    assert total <= max_bytes + 3*4*entry_bytes
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import (load_network, all_demands, simulate_baseline, price_baseline, price_energy, run_epanet,
+                     assign_pooled_demand, energy_matrix, total_costs, total_energy)
+from wds_sim.golden import _reference_energy_cost
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+TARIFF = pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)
+
+### The BAU simulated once and priced under every tariff is the energy_cost of a full run per tariff ###
+def test_price_baseline_matches_energy_cost():
+    wn = load_network(INP_FILE)
+    bau = price_baseline(simulate_baseline(wn), TARIFF)
+    results = run_epanet(wn)
+    assert list(bau) == list(TARIFF.columns)
+    for T in TARIFF.columns[:5]:
+        expected = _reference_energy_cost(wn, results, TARIFF[T])
+        pd.testing.assert_frame_equal(bau[T], expected, check_dtype = False)
+
+### Daily energy and cost of several scenarios under all tariffs in one product, as price_energy sums them ###
+def test_total_costs_match_price_energy():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    energies = [simulate_baseline(wn)]
+    assign_pooled_demand(wn, original_demands_df*np.linspace(0.8, 1.2, len(original_demands_df))[:, None])
+    energies.append(simulate_baseline(wn))
+    costs = total_costs(energy_matrix(energies), TARIFF)
+    energy = total_energy(energy_matrix(energies))
+    assert costs.shape == (2, len(TARIFF.columns))
+    for i, energy_df in enumerate(energies):
+        for j, T in enumerate(TARIFF.columns):
+            priced = price_energy(energy_df, TARIFF[T])
+            assert abs(costs[i, j] - priced['Cost'].sum()) < 1e-9
+            assert abs(energy[i] - priced['Energy (kWh)'].sum()) < 1e-9
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from wds_sim import ResultsCube
+
+TARIFFS = ['Flat', 'Symmetric']
+S = [1, 8]
+X = [0.5, 1.0]
+METRICS = ['Energy Savings Percentage', 'Cost Savings Percentage']
+
+def _label(s, x):
+    return 'S='+str(s)+' X='+str(x)
+
+### The cube's tables against tables filled cell by cell with .at, as the scripts did; unfilled scenarios stay NaN ###
+def test_cube_tables_match_at_filled_tables():
+    cube = ResultsCube(TARIFFS, [S, X], METRICS, label = _label)
+    expected = {metric: pd.DataFrame(np.nan, index = [_label(s, x) for s in S for x in X], columns = TARIFFS)
+                for metric in METRICS}
+    for i, T in enumerate(TARIFFS):
+        for s in S:
+            for x in X:
+                if T == 'Symmetric' and s == 8 and x == 1.0:
+                    continue
+                values = [s*x + i, s - x*i]
+                cube[T, s, x] = values
+                for metric, value in zip(METRICS, values):
+                    expected[metric].at[_label(s, x), T] = value
+    assert cube['Flat', 8, 0.5] == [4.0, 8.0]
+    tables = cube.tables()
+    for metric in METRICS:
+        pd.testing.assert_frame_equal(tables[metric], expected[metric])
+    assert np.isnan(tables[METRICS[0]].at['S=8 X=1.0', 'Symmetric'])
+
+### One scenario axis: the rows are labelled by the axis values themselves ###
+def test_cube_single_axis_labels():
+    cube = ResultsCube(TARIFFS, [[0.1, 0.2]], METRICS)
+    cube['Flat', 0.2] = [1.0, 2.0]
+    tables = cube.tables()
+    assert tables[METRICS[1]].index.tolist() == [0.1, 0.2]
+    assert tables[METRICS[1]].at[0.2, 'Flat'] == 2.0
+    assert tables[METRICS[1]].isna().sum().sum() == 3
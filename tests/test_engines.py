@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pytest
+
+from wds_sim import reference_feedback_tables, run_feedback_sweep, compare_golden, FEEDBACK_TABLES, PEAK_DEMAND_TABLE
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+
+### Flat ties the BAU costs of many hours, so the peak hours at S=8 depend on how the ties break ###
+S = [1, 8]
+X = [0.5, 1.0]
+
+@pytest.fixture(scope = 'module')
+def tariff():
+    return pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)[['Flat', 'Symmetric']]
+
+@pytest.fixture(scope = 'module')
+def reference(tariff):
+    return reference_feedback_tables(INP_FILE, tariff, S, X)
+
+### Exact demand metrics: the engine shifts the same peak and off-peak hours as the reference ###
+STRICT = {'Demand Shifted Percentage': 1e-9, 'Total Demand Difference': 1e-9, PEAK_DEMAND_TABLE: 1e-9}
+
+### The pattern group engine against the reference (EpanetSimulator) sweep of the original scripts ###
+def test_groups_engine_matches_reference(tariff, reference):
+    tables = run_feedback_sweep(INP_FILE, tariff, S, X, processes = 1, engine = 'groups')
+    report = compare_golden(reference, tables, STRICT)
+    assert report.empty, report.to_string()
+
+### The toolkit engine runs the same EPANET solver in process, so every table matches the reference exactly ###
+def test_toolkit_engine_matches_reference(tariff, reference):
+    tables = run_feedback_sweep(INP_FILE, tariff, S, X, processes = 1, engine = 'toolkit')
+    report = compare_golden(reference, tables, {table: 1e-9 for table in list(FEEDBACK_TABLES) + [PEAK_DEMAND_TABLE]})
+    assert report.empty, report.to_string()
+
+### The packed engine agrees with separate runs to EPANET's accuracy, within the default tolerances ###
+def test_packed_engine_matches_reference(tariff, reference):
+    tables = run_feedback_sweep(INP_FILE, tariff, S, X, processes = 1, engine = 'packed')
+    report = compare_golden(reference, tables, STRICT)
+    assert report.empty, report.to_string()
+
+### The snapshot engine reuses solved hours across scenarios, and agrees with the reference like the packed engine ###
+def test_snapshot_engine_matches_reference(tariff, reference):
+    tables = run_feedback_sweep(INP_FILE, tariff, S, X, processes = 1, engine = 'snapshot')
+    report = compare_golden(reference, tables, STRICT)
+    assert report.empty, report.to_string()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from wds_sim import save_golden, load_golden, compare_golden
+
+ROWS = ['S=1 X=0.5', 'S=1 X=1.0']
+TARIFFS = ['Flat', 'Symmetric']
+
+def _golden():
+    return {'Energy Savings Percentage': pd.DataFrame([[1.25, 2.5], [np.nan, 4.0]], index = ROWS, columns = TARIFFS),
+            'Total Demand Difference': pd.DataFrame([[10.0, 20.0], [30.0, 40.0]], index = ROWS, columns = TARIFFS)}
+
+def test_save_and_load_golden(tmp_path):
+    golden = _golden()
+    save_golden(tmp_path/'golden.npz', golden)
+    loaded = load_golden(tmp_path/'golden.npz')
+    for metric in golden:
+        pd.testing.assert_frame_equal(loaded[metric], golden[metric])
+
+### Within tolerance (the tolerance itself included) nothing is reported; NaN on one side only and ###
+### values beyond the metric's tolerance are, as is every cell of a missing metric ###
+def test_compare_golden_report():
+    golden = _golden()
+    tables = {metric: table.copy() for metric, table in golden.items()}
+    tables['Energy Savings Percentage'].iloc[0, 0] += 0.01
+    tables['Total Demand Difference'] += 0.1
+    assert compare_golden(golden, tables).empty
+
+    tables['Energy Savings Percentage'].iloc[0, 1] = np.nan
+    tables['Energy Savings Percentage'].iloc[1, 0] = 3.0
+    tables['Total Demand Difference'].iloc[1, 1] = 40.5
+    report = compare_golden(golden, tables)
+    assert list(zip(report['metric'], report['scenario'], report['tariff'])) == [
+        ('Energy Savings Percentage', 'S=1 X=0.5', 'Symmetric'),
+        ('Energy Savings Percentage', 'S=1 X=1.0', 'Flat'),
+        ('Total Demand Difference', 'S=1 X=1.0', 'Symmetric')]
+    assert report['tolerance'].tolist() == [0.01, 0.01, 0.1]
+    assert compare_golden(golden, tables, {'Total Demand Difference': 1.0}).shape[0] == 2
+
+    del tables['Total Demand Difference']
+    report = compare_golden(golden, tables)
+    assert (report['metric'] == 'Total Demand Difference').sum() == 4
@@ -0,0 +1,26 @@
+import os
+
+import pandas as pd
+
+from wds_sim import ScenarioJournal
+
+TARIFF = pd.DataFrame({'Flat': [0.1]*24, 'Symmetric': [0.05]*12+[0.15]*12})
+
+### A journal is resumed by a sweep with the same parameters only ###
+def test_resume_needs_same_parameters(tmp_path):
+    path = str(tmp_path / 'Journal.jsonl')
+    parameters = {'E': [0.05, 0.1], 'M': 0.1, 'Tariff': TARIFF}
+    with ScenarioJournal(path, parameters) as journal:
+        journal.record(('Flat', 0.05), [1.0, 2.0])
+    with ScenarioJournal(path, dict(parameters)) as journal:
+        assert journal[('Flat', 0.05)] == [1.0, 2.0]
+        journal.record(('Flat', 0.1), None)
+    with ScenarioJournal(path, dict(parameters, M = 0.2)) as journal:
+        assert len(journal) == 0
+    assert os.path.exists(path+'.stale')
+    changed = TARIFF.copy()
+    changed.iloc[0, 0] = 0.2
+    with ScenarioJournal(path, dict(parameters, M = 0.2)) as journal:
+        journal.record(('Flat', 0.05), [3.0, 4.0])
+    with ScenarioJournal(path, dict(parameters, M = 0.2, Tariff = changed)) as journal:
+        assert ('Flat', 0.05) not in journal
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import load_network, all_demands, assign_pooled_demand, HOURS
+
+INP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Net3.inp')
+
+### all_demands of the original scripts: a loop over the junctions and their demand lists ###
+def _all_demands_loop(wn):
+    df = pd.DataFrame(index = HOURS)
+    for name in wn.junction_name_list:
+        lst = [0]*len(HOURS)
+        for demand in wn.get_node(name).demand_timeseries_list:
+            lst = np.add(lst, demand.base_value*wn.get_pattern(demand.pattern).multipliers)
+        df[name] = lst
+    for col in df.columns:
+        if df[col].sum() == 0:
+            df = df.drop([col], axis = 1)
+    return df
+
+### The vectorized matrix is identical to the loop, before and after the demands change ###
+def test_all_demands_matches_loop():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    pd.testing.assert_frame_equal(original_demands_df, _all_demands_loop(wn), check_exact = True)
+
+    new_demands_df = original_demands_df*np.linspace(0.5, 1.5, len(HOURS))[:, None]
+    assign_pooled_demand(wn, new_demands_df)
+    pd.testing.assert_frame_equal(all_demands(wn), _all_demands_loop(wn), check_exact = True)
+
+    ### changed in place, without assign_demand ###
+    junction = wn.get_node(original_demands_df.columns[0])
+    junction.demand_timeseries_list[0].base_value *= 2
+    demands_df = all_demands(wn)
+    pd.testing.assert_frame_equal(demands_df, _all_demands_loop(wn), check_exact = True)
+    assert not demands_df.equals(new_demands_df)
+
+### Repeated assignments reuse one pattern per junction, so the pattern list stops growing ###
+def test_assign_pooled_demand_reuses_patterns():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    assign_pooled_demand(wn, original_demands_df)
+    n_patterns = len(wn.pattern_name_list)
+    for scale in [0.5, 1.0, 1.5]:
+        assign_pooled_demand(wn, original_demands_df*scale)
+        assert len(wn.pattern_name_list) == n_patterns
+        pd.testing.assert_frame_equal(all_demands(wn), original_demands_df*scale)
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import load_network, all_demands, assign_pooled_demand, hydraulics_energy, run_epanet_pumps
+from wds_sim import PatternGroupEngine, shift_demands_feedback_batch
+
+INP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Net3.inp')
+
+### Demands that are not uniform within a group: one junction of the largest group scaled on its own ###
+def _ungrouped_demands(original_demands_df, groups, factor):
+    demands_df = original_demands_df.copy()
+    name = max(groups.members.values(), key = len)[0]
+    demands_df[name] = demands_df[name]*factor
+    return demands_df
+
+### Two non-uniform scenarios back to back reuse the engine's pooled patterns and match the EpanetSimulator path ###
+def test_ungrouped_scenarios_back_to_back():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    with PatternGroupEngine(wn) as engine:
+        for factor in [1.5, 0.5]:
+            demands_df = _ungrouped_demands(original_demands_df, engine.groups, factor)
+            energy = hydraulics_energy(wn, *engine.pump_hydraulics(demands_df))
+            assign_pooled_demand(wn, demands_df)
+            expected = hydraulics_energy(wn, *run_epanet_pumps(wn))
+            assert np.allclose(energy['Energy (kWh)'], expected['Energy (kWh)'], rtol = 1e-4)
+        assert engine.ungrouped == 2
+        assert engine.grouped == 0
+
+### Group multipliers shifted by the feedback model are solved as they are and agree with the junction demands ###
+def test_shifted_group_multipliers():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    peak = original_demands_df.index.isin(original_demands_df.index[:3])
+    off_peak = original_demands_df.index.isin(original_demands_df.index[-3:])
+    with PatternGroupEngine(wn) as engine:
+        groups = engine.groups
+        shifted, QT = shift_demands_feedback_batch(groups.multipliers, peak, off_peak, 3, [0.5])
+        group_demands = pd.DataFrame(shifted[0], index = groups.multipliers.index, columns = groups.multipliers.columns)
+        energy = hydraulics_energy(wn, *engine.pump_hydraulics(group_demands))
+        assert engine.grouped == 1
+    junction_demands = pd.DataFrame(groups.junction_demands(shifted[0]), index = original_demands_df.index,
+                                    columns = groups.junctions)
+    expected, _ = shift_demands_feedback_batch(original_demands_df, peak, off_peak, 3, [0.5])
+    assert np.allclose(junction_demands[original_demands_df.columns].values, expected[0])
+    assign_pooled_demand(wn, junction_demands)
+    expected = hydraulics_energy(wn, *run_epanet_pumps(wn))
+    assert np.allclose(energy['Energy (kWh)'], expected['Energy (kWh)'], rtol = 1e-4)
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import (limit_qmax, max_feasible, max_feasible_value, elasticity_feasibility, load_network, all_demands,
+                     FEEDBACK_TABLES)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+ROWS = ['S=1 X=0.5', 'S=1 X=1.0']
+COLUMNS = ['Flat', 'Symmetric']
+MAX_DEMAND = 100.0
+
+def _tables():
+    return {name: pd.DataFrame([[1.0+i, 2.0+i], [3.0+i, 4.0+i]], index = ROWS, columns = COLUMNS)
+            for i, name in enumerate(FEEDBACK_TABLES)}
+
+### The post-filter: scenarios within (1+m) times the BAU peak keep their values, the others are set to 0 ###
+def test_limit_qmax_all_feasible():
+    tables = _tables()
+    peak_demand = pd.DataFrame(MAX_DEMAND, index = ROWS, columns = COLUMNS)
+    limited = limit_qmax(tables, peak_demand, MAX_DEMAND, [0, 0.1])
+    for m in [0, 0.1]:
+        for name in FEEDBACK_TABLES:
+            pd.testing.assert_frame_equal(limited[m][name], tables[name])
+
+def test_limit_qmax_none_feasible():
+    tables = _tables()
+    peak_demand = pd.DataFrame(MAX_DEMAND*1.5, index = ROWS, columns = COLUMNS)
+    limited = limit_qmax(tables, peak_demand, MAX_DEMAND, [0, 0.1])
+    for m in [0, 0.1]:
+        for name in FEEDBACK_TABLES:
+            assert (limited[m][name].values == 0).all()
+
+### A peak exactly at the limit is feasible, one just above it is not ###
+def test_limit_qmax_boundary():
+    tables = _tables()
+    peak_demand = pd.DataFrame([[MAX_DEMAND*1.1, np.nextafter(MAX_DEMAND*1.1, np.inf)], [MAX_DEMAND, MAX_DEMAND*1.2]],
+                               index = ROWS, columns = COLUMNS)
+    limited = limit_qmax(tables, peak_demand, MAX_DEMAND, [0, 0.1])
+    name = FEEDBACK_TABLES[0]
+    np.testing.assert_array_equal(limited[0][name].values, [[0, 0], [3.0, 0]])
+    np.testing.assert_array_equal(limited[0.1][name].values, [[1.0, 0], [3.0, 0]])
+
+VALUES = [0.0, 0.1, 0.2, 0.3, 0.4]
+
+### The bisection over sorted values: all feasible gives the last, none gives None, else the last one feasible ###
+def test_max_feasible():
+    assert max_feasible(lambda value: True, VALUES) == 0.4
+    assert max_feasible(lambda value: False, VALUES) is None
+    assert max_feasible(lambda value: value <= 0.2, VALUES) == 0.2
+    assert max_feasible(lambda value: value <= 0.0, VALUES) == 0.0
+    assert max_feasible(lambda value: True, []) is None
+
+### The bisection over an interval: upper when feasible, None when lower is not, else the boundary within tolerance ###
+def test_max_feasible_value():
+    assert max_feasible_value(lambda value: True, 0.0, 1.0) == 1.0
+    assert max_feasible_value(lambda value: False, 0.0, 1.0) is None
+    assert max_feasible_value(lambda value: value <= 0.0, 0.0, 1.0) <= 1e-4
+    value = max_feasible_value(lambda value: value <= 0.37, 0.0, 1.0)
+    assert 0.37 - 1e-4 <= value <= 0.37
+
+### On Net3: the elasticity found is feasible and one tolerance step above it is not ###
+def test_max_feasible_elasticity():
+    original_demands_df = all_demands(load_network(os.path.join(ROOT, 'Net3.inp')))
+    water_Ta = pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)['Random 1']
+    feasible = elasticity_feasibility(original_demands_df, water_Ta, 1.1*original_demands_df.sum(axis = 1).max())
+    e = max_feasible_value(feasible, 0.0, 100.0)
+    assert e is not None and e < 100.0
+    assert feasible(e) and not feasible(e + 1e-4)
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wds_sim import load_network, all_demands, shift_demands_elasticity, shift_demands_feedback_batch
+from wds_sim.golden import _reference_elasticity_demands, _reference_feedback_demands
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+
+E = [0.1, 0.5, 1.0]
+X = [0.1, 0.5, 1.0]
+
+@pytest.fixture(scope = 'module')
+def original_demands_df():
+    return all_demands(load_network(INP_FILE))
+
+@pytest.fixture(scope = 'module')
+def tariff():
+    return pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)
+
+### The broadcast over all elasticities against the per-junction, per-hour loop of the original scripts ###
+@pytest.mark.parametrize('T', ['Symmetric', 'Random 1'])
+def test_elasticity_matches_loop(original_demands_df, tariff, T):
+    new, details = shift_demands_elasticity(original_demands_df, tariff[T], E)
+    for i, e in enumerate(E):
+        new_demands_df, response_details = _reference_elasticity_demands(original_demands_df, tariff[T], e)
+        np.testing.assert_allclose(new[i], new_demands_df.values, rtol = 1e-12, atol = 1e-12)
+        for column in response_details.columns:
+            np.testing.assert_allclose(details.loc[e, column].values, response_details[column].values, rtol = 1e-12)
+
+### All uptake rates in one batch against the loop, with the s cheapest and dearest hours of a tariff ###
+@pytest.mark.parametrize('s', [1, 8])
+def test_feedback_batch_matches_loop(original_demands_df, tariff, s):
+    hours = tariff['Random 1'].sort_values(kind = 'stable').index
+    off_peak_hours = hours[:s].tolist()
+    peak_hours = hours[len(hours)-s:].tolist()
+    peak = original_demands_df.index.isin(peak_hours)
+    off_peak = original_demands_df.index.isin(off_peak_hours)
+    new, QT = shift_demands_feedback_batch(original_demands_df, peak, off_peak, s, X)
+    for i, x in enumerate(X):
+        new_demands_df, response_details = _reference_feedback_demands(original_demands_df, peak_hours, off_peak_hours, s, x)
+        np.testing.assert_allclose(new[i], new_demands_df.values, rtol = 1e-12, atol = 1e-12)
+        np.testing.assert_allclose(QT[i], response_details['shifted demand'].values, rtol = 1e-12)
+        np.testing.assert_allclose(new[i].sum(axis = 0), response_details['Demand After'].values, rtol = 1e-12)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from wds_sim import ScenarioScreen
+
+### Unchanged demands take the baseline energy, repeated demands the energy of their first simulation, ###
+### and new demands (a one-unit change included) still need a simulation ###
+def test_screen_zero_shift_and_duplicates():
+    original_demands_df = pd.DataFrame(np.arange(12, dtype = float).reshape(4, 3))
+    baseline = pd.Series([1.0, 2.0, 3.0, 4.0])
+    screen = ScenarioScreen(original_demands_df, baseline)
+
+    assert screen.screen(('Flat', 0.1), original_demands_df.copy()) is baseline
+
+    shifted = original_demands_df*1.1
+    assert screen.screen(('Random 1', 0.1), shifted) is None
+    energy = pd.Series([5.0, 6.0, 7.0, 8.0])
+    screen.record(('Random 1', 0.1), shifted, energy)
+    assert screen.screen(('Random 2', 0.1), original_demands_df*1.1) is energy
+
+    changed = shifted.copy()
+    changed.iloc[0, 0] += 1
+    assert screen.screen(('Random 3', 0.1), changed) is None
+    assert screen.stats() == {'zero_shift': 1, 'duplicates': 1, 'simulated': 1}
@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+import pytest
+
+from wds_sim import (set_scratch_dir, scratch_prefix, simulation_files, load_network, run_epanet, run_epanet_pumps,
+                     pump_hydraulics)
+
+INP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Net3.inp')
+
+@pytest.fixture
+def scratch(tmp_path):
+    set_scratch_dir(str(tmp_path))
+    yield tmp_path
+    set_scratch_dir(None)
+
+### Every prefix is new and lies in the scratch directory ###
+def test_scratch_prefix_unique(scratch):
+    prefixes = {scratch_prefix('packed') for _ in range(100)}
+    assert len(prefixes) == 100
+    assert all(os.path.dirname(prefix) == str(scratch) for prefix in prefixes)
+    assert all(os.path.basename(prefix).startswith('wds-packed-'+str(os.getpid())+'-') for prefix in prefixes)
+
+### The files of a run are removed on exit, even when the run fails ###
+def test_simulation_files_removed_on_error(scratch):
+    wn = load_network(INP_FILE)
+    with pytest.raises(RuntimeError):
+        with simulation_files() as file_prefix:
+            run_epanet(wn, file_prefix)
+            assert os.path.exists(file_prefix+'.bin')
+            raise RuntimeError
+    assert os.listdir(scratch) == []
+    run_epanet(wn)
+    assert os.listdir(scratch) == []
+
+### Decoding only the pump columns gives exactly what pump_hydraulics reads from the full results ###
+def test_run_epanet_pumps_matches_full_results(scratch):
+    wn = load_network(INP_FILE)
+    pump_flowrate, head = pump_hydraulics(wn, run_epanet(wn))
+    pumps_flowrate, pumps_head = run_epanet_pumps(wn)
+    pd.testing.assert_frame_equal(pumps_flowrate, pump_flowrate, check_exact = True, check_names = False)
+    pd.testing.assert_frame_equal(pumps_head, head, check_exact = True, check_names = False)
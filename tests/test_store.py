@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import write_results, read_results, write_table, read_table
+from wds_sim import store
+
+def _tables():
+    rng = np.random.default_rng(0)
+    index = [0.05, 0.1, 0.15]
+    columns = ['Flat', 'Random 1', 'Symmetric']
+    energy = pd.DataFrame(rng.random((3, 3)), index = index, columns = columns)
+    energy.iloc[2, 1] = np.nan
+    return {'Energy Savings Percentage': energy,
+            'Cost Savings Percentage': pd.DataFrame(rng.random((3, 3)), index = index, columns = columns)}
+
+### Without a Parquet engine, results are written as CSV and read back as written ###
+def test_csv_fallback_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, '_parquet_available', lambda: False)
+    tables = _tables()
+    write_results(str(tmp_path), 'No Limits/Same Tariff', tables)
+    assert os.path.exists(os.path.join(str(tmp_path), 'No Limits', 'Same Tariff', 'tariff=Flat', 'results.csv'))
+    read = read_results(str(tmp_path), 'No Limits/Same Tariff', list(tables))
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(read[name], table)
+    read = read_results(str(tmp_path), 'No Limits/Same Tariff', ['Cost Savings Percentage'], ['Symmetric'])
+    pd.testing.assert_frame_equal(read['Cost Savings Percentage'], tables['Cost Savings Percentage'][['Symmetric']])
+
+    hourly = pd.DataFrame({'Original Demand': [1.5, 2.0], 'New Demand': [1.25, 2.5]}, index = [0, 3600])
+    write_table(str(tmp_path), 'No Limits/Same Tariff Hourly', 'Flat', hourly)
+    pd.testing.assert_frame_equal(read_table(str(tmp_path), 'No Limits/Same Tariff Hourly', 'Flat'), hourly)
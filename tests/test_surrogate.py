@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import load_network, all_demands, assign_pooled_demand, hydraulics_energy, run_epanet_pumps
+from wds_sim import shift_demands_elasticity, train_energy_surrogate
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+TARIFF_FILE = os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx')
+
+### Pattern names of the demands of every junction ###
+def _demand_patterns(wn):
+    return [[demand.pattern_name for demand in wn.get_node(name).demand_timeseries_list] for name in wn.junction_name_list]
+
+### Training leaves the caller's network as it was; the screen keeps the candidates that are best once ###
+### simulated and drops most of the others ###
+def test_screen_drops_candidates():
+    wn = load_network(INP_FILE)
+    original_demands_df = all_demands(wn)
+    patterns, pattern_names = _demand_patterns(wn), list(wn.pattern_name_list)
+    surrogate = train_energy_surrogate(wn, original_demands_df)
+    assert _demand_patterns(wn) == patterns
+    assert list(wn.pattern_name_list) == pattern_names
+
+    Tariff = pd.read_excel(TARIFF_FILE, index_col = 0)
+    E = np.arange(0.05, 1.05, 0.05).round(2).tolist()
+    candidates = np.concatenate([shift_demands_elasticity(original_demands_df, Tariff[T], E)[0]
+                                 for T in Tariff.columns[3:7]])
+    Ta = Tariff['Random 1']
+    kept = surrogate.screen(candidates, Ta, top = 5)
+    assert 5 <= len(kept) < len(candidates)//2
+
+    costs = []
+    for candidate in candidates:
+        assign_pooled_demand(wn, pd.DataFrame(candidate, index = original_demands_df.index,
+                                              columns = original_demands_df.columns))
+        energy = hydraulics_energy(wn, *run_epanet_pumps(wn))
+        costs.append((energy['Energy (kWh)']*Ta.values).sum())
+    assert set(np.argsort(costs)[:5]) <= set(kept)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wds_sim import (load_network, all_demands, shift_demands_feedback, run_feedback_sweep, reference_feedback_tables,
+                     compare_golden, FEEDBACK_TABLES, PEAK_DEMAND_TABLE)
+from wds_sim.golden import _reference_feedback_demands
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INP_FILE = os.path.join(ROOT, 'Net3.inp')
+
+### Every metric to float accuracy: the EpanetSimulator path of the sweep is the original scripts' path ###
+EXACT = {metric: 1e-9 for metric in FEEDBACK_TABLES + [PEAK_DEMAND_TABLE]}
+
+### The feedback model of the sweep gives the new demands and shifted totals of the original loop ###
+def test_shift_demands_feedback_matches_loop():
+    original_demands_df = all_demands(load_network(INP_FILE))
+    hours = list(original_demands_df.index)
+    peak_hours, off_peak_hours = hours[18:22], hours[1:5]
+    new_demands_df, response_details = shift_demands_feedback(original_demands_df, peak_hours, off_peak_hours, 4, 0.3)
+    expected_df, expected_details = _reference_feedback_demands(original_demands_df, peak_hours, off_peak_hours, 4, 0.3)
+    assert np.allclose(new_demands_df.values, expected_df.values, rtol = 0, atol = 1e-12)
+    for column in expected_details.columns:
+        assert np.allclose(response_details[column], expected_details[column], rtol = 0, atol = 1e-9)
+
+### The pool and the serial run give the same tables, those of the original scripts' loop ###
+def test_pool_matches_serial_and_reference():
+    Tariff = pd.read_excel(os.path.join(ROOT, '2. Limited Qmax', 'Tariff.xlsx'), index_col = 0)[['Symmetric', 'Random 1']]
+    S, X = [2, 6], [0.3, 1.0]
+    pooled = run_feedback_sweep(INP_FILE, Tariff, S, X, processes = 2)
+    serial = run_feedback_sweep(INP_FILE, Tariff, S, X, processes = 1)
+    for name in FEEDBACK_TABLES + [PEAK_DEMAND_TABLE]:
+        pd.testing.assert_frame_equal(pooled[name], serial[name])
+    report = compare_golden(reference_feedback_tables(INP_FILE, Tariff, S, X), pooled, EXACT)
+    assert report.empty, report.to_string()
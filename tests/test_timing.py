@@ -0,0 +1,38 @@
+import json
+
+from wds_sim import StageTimer, SweepProgress, write_summary
+
+### Each scenario's stages become its row and still count in the run totals; the stages timed before are kept ###
+def test_scenario_rows_and_totals():
+    timer = StageTimer()
+    timer.add('all demands', 1.0)
+    with timer.scenario(('Flat', 0.1)):
+        timer.add('solve', 2.0)
+        timer.add('inp write', 0.5)
+    with timer.scenario(('Flat', 0.2)):
+        timer.add('solve', 3.0)
+    assert [key for key, scenarios, stages in timer.scenarios] == [('Flat', 0.1), ('Flat', 0.2)]
+    assert timer.scenarios[0][2]['solve'] == 2.0
+    assert timer.scenarios[1][2]['solve'] == 3.0
+    assert 'all demands' not in timer.scenarios[0][2]
+    assert timer.stages['solve'] == [5.0, 2]
+    assert timer.stages['all demands'] == [1.0, 1]
+    assert timer.stages['bookkeeping'][1] == 2
+
+### The summary lists every scenario's stages and the slowest scenarios first ###
+def test_write_summary_scenario_stages(tmp_path):
+    timer = StageTimer()
+    progress = SweepProgress(2)
+    with timer.scenario(('Flat', 0.1)):
+        timer.add('solve', 1.0)
+    with timer.scenario(('Flat', 0.2)):
+        timer.add('solve', 3.0)
+    progress.update(2)
+    path = tmp_path/'summary.json'
+    summary = write_summary(path, progress, timer, engine = 'toolkit')
+    with open(path) as f:
+        assert json.load(f) == summary
+    assert [row['scenario'] for row in summary['scenario_stages']] == [['Flat', 0.1], ['Flat', 0.2]]
+    assert summary['slowest_scenarios'] == [['Flat', 0.2], ['Flat', 0.1]]
+    assert summary['stages']['solve']['calls'] == 2
+    assert summary['engine'] == 'toolkit'
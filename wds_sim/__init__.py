@@ -0,0 +1,24 @@
+from .network import (HOURS, load_network, all_demands, assign_pooled_demand, pump_node_names,
+                      pump_hydraulics, hydraulics_energy, pump_energy, price_energy, energy_cost)
+from .simulation import (SCRATCH_ENV, set_scratch_dir, scratch_dir, scratch_prefix, simulation_files, run_epanet,
+                         read_pump_hydraulics, run_epanet_pumps, SimulationEngine)
+from .baseline import simulate_baseline, price_baseline
+from .costing import energy_matrix, cost_cube, total_costs, total_energy
+from .cache import HydraulicCache, simulate_pump_hydraulics, simulate_pump_hydraulics_batch
+from .toolkit import ToolkitEngine
+from .packed import PackedEngine
+from .snapshot import SnapshotEngine
+from .patterns import PatternGroups, PatternGroupEngine
+from .response import RESPONSE_DETAILS, shift_demands_elasticity, shift_demands_feedback_batch, shift_demands_feedback
+from .journal import ScenarioJournal, sweep_digest
+from .screen import ScenarioScreen
+from .cube import ResultsCube
+from .sweep import FEEDBACK_TABLES, ELASTICITY_TABLES, PEAK_DEMAND_TABLE, run_feedback_sweep, feedback_parameters
+from .qmax import (qmax_feasible, limit_qmax, max_feasible, max_feasible_value, elasticity_feasibility,
+                   uptake_feasibility)
+from .adaptive import refine_grid, elasticity_scenarios, elasticity_metric, run_adaptive_feedback_sweep
+from .surrogate import EnergySurrogate, random_group_demands, train_energy_surrogate
+from .store import write_results, read_results, write_table, read_table
+from .timing import StageTimer, SweepProgress, stage_timer, timed, write_summary
+from .golden import (save_golden, load_golden, compare_golden, reference_feedback_tables, reference_elasticity_tables,
+                     make_feedback_golden, make_elasticity_golden, check_feedback_engine, check_stored_results)
@@ -0,0 +1,187 @@
+import logging
+import multiprocessing
+import os
+
+import pandas as pd
+
+from . import sweep
+from .network import assign_pooled_demand, hydraulics_energy, price_energy
+from .qmax import elasticity_feasibility, uptake_feasibility
+from .response import shift_demands_elasticity
+from .simulation import run_epanet_pumps
+from .sweep import ELASTICITY_TABLES, FEEDBACK_TABLES, PEAK_DEMAND_TABLE
+from .timing import StageTimer, SweepProgress, stage_timer, write_summary
+
+logger = logging.getLogger(__name__)
+
+### Adaptive sampling of a 1-D scenario grid (elasticity E, or uptake rate X of one (T, S) pair): starts from a ###
+### coarse grid and bisects, one simulation at a time, the interval where the metric changes the most, or first ###
+### any interval crossing the feasibility boundary (e.g. the Qmax margin), until every interval changes by at ###
+### most tolerance, the intervals reach min_step or the simulation budget is spent ###
+### evaluate(value) simulates a scenario and returns its result, metric(result) the number refined on ###
+### (default: the result itself); feasible(value), checked without simulation, marks scenarios to skip ###
+### returns {value: result, or None for an infeasible scenario} sorted by value, and the number of simulations ###
+def refine_grid(evaluate, grid, tolerance, budget = None, min_step = None, feasible = None, metric = None,
+                decimals = 4):
+    results = {}
+    simulations = 0
+    exhausted = set()
+
+    def sample(value):
+        nonlocal simulations
+        if feasible is not None and not feasible(value):
+            results[value] = None
+        else:
+            results[value] = evaluate(value)
+            simulations += 1
+
+    for value in grid:
+        value = round(float(value), decimals)
+        if value not in results and (budget is None or simulations < budget):
+            sample(value)
+    while budget is None or simulations < budget:
+        values = sorted(results)
+        best = None
+        for a, b in zip(values[:-1], values[1:]):
+            if (a, b) in exhausted or (min_step is not None and b - a < 2*min_step):
+                continue
+            fa, fb = results[a], results[b]
+            if (fa is None) != (fb is None):
+                ### boundary intervals first, widest first ###
+                score = (1, b - a)
+            elif fa is None:
+                continue
+            else:
+                change = abs(metric(fb) - metric(fa)) if metric is not None else abs(fb - fa)
+                if change <= tolerance:
+                    continue
+                score = (0, change)
+            if best is None or score > best[0]:
+                best = (score, a, b)
+        if best is None:
+            break
+        middle = round((best[1] + best[2])/2, decimals)
+        if middle in results:
+            ### interval narrower than the rounding of the values ###
+            exhausted.add((best[1], best[2]))
+            continue
+        sample(middle)
+    logger.info('adaptive grid: %d values, %d simulations', len(results), simulations)
+    return dict(sorted(results.items())), simulations
+
+### Evaluate and feasible functions of the elasticity scenarios of one tariff, for refine_grid: ###
+### evaluate(e) simulates elasticity e and returns its results in ELASTICITY_TABLES order, computed like the ###
+### elasticity scripts against the baseline (BAU hourly pump energy); with max_peak, feasible(e) holds when ###
+### the peak total hourly demand of the shifted demands is at most max_peak (demand transform only) ###
+### screen: ScenarioScreen reusing the energy of unchanged or repeated demands, scenarios keyed (name, e) ###
+def elasticity_scenarios(wn, original_demands_df, baseline, Ta, water_Ta, max_peak = None, screen = None, name = None):
+    pump_energy_original = price_energy(baseline,Ta)
+    original_energy = pump_energy_original['Energy (kWh)'].sum()
+    original_cost = pump_energy_original['Cost'].sum()
+    original_revenue = (original_demands_df.sum(axis = 1)*water_Ta).sum()
+    original_net = original_revenue - original_cost
+
+    def simulate(e):
+        new, details = shift_demands_elasticity(original_demands_df, water_Ta, [e])
+        new, response_details = new[0], details.loc[e]
+        new_demands_df = original_demands_df.copy()
+        new_demands_df[:] = new
+        energy = screen.screen((name, e), new_demands_df) if screen is not None else None
+        if energy is None:
+            assign_pooled_demand(wn,new_demands_df)
+            energy = hydraulics_energy(wn,*run_epanet_pumps(wn))
+            if screen is not None:
+                screen.record((name, e), new_demands_df, energy)
+        pump_energy = price_energy(energy,Ta)
+        new_energy = pump_energy['Energy (kWh)'].sum()
+        new_cost = pump_energy['Cost'].sum()
+        new_revenue = (new_demands_df.sum(axis = 1)*water_Ta).sum()
+        new_net = new_revenue - new_cost
+        return [round((new_energy - original_energy)*100/original_energy ,2),
+                round((original_cost - new_cost)*100/original_cost,2),
+                round((new_revenue - original_revenue)*100/original_revenue,2),
+                round((new_net - original_net)*100/abs(original_net),2),
+                round(response_details['Demand Before'].sum() - response_details['Demand After'].sum(),4),
+                round(response_details['shifted demand'].sum() * 100 / response_details['Demand Before'].sum(),2)]
+
+    ### every simulated elasticity is timed as its own scenario row of stage_timer ###
+    def evaluate(e):
+        with stage_timer.scenario((name, e)):
+            return simulate(e)
+
+    return evaluate, (elasticity_feasibility(original_demands_df, water_Ta, max_peak) if max_peak is not None else None)
+
+### metric(result) of refine_grid for one of the ELASTICITY_TABLES, e.g. 'Cost Savings Percentage' ###
+def elasticity_metric(name):
+    position = ELASTICITY_TABLES.index(name)
+    return lambda result: result[position]
+
+### Task: refine_grid over the uptake rates of one (T, S) pair, in the worker of run_feedback_sweep's pool, from the ###
+### coarse X of the task; refinement: (tolerance, budget, min_step, position of the metric, M) ###
+### returns {x: results in FEEDBACK_TABLES order and the peak total demand, or None}, the simulations and stages ###
+def _adaptive_feedback_task(task):
+    (T, Ta, s, X, peak_hours, off_peak_hours, original_energy, original_cost), refinement = task
+    tolerance, budget, min_step, position, M = refinement
+
+    def evaluate(x):
+        return sweep._feedback_rows((T, Ta, s, [x], peak_hours, off_peak_hours, original_energy, original_cost))[0][0]
+
+    feasible = None
+    if M is not None:
+        original_demands_df = sweep._original_demands_df
+        feasible = uptake_feasibility(original_demands_df, original_demands_df.index.isin(peak_hours),
+                                      original_demands_df.index.isin(off_peak_hours), s,
+                                      (1+M)*original_demands_df.sum(axis = 1).max())
+    with stage_timer.capture() as stages:
+        results, simulations = refine_grid(evaluate, X, tolerance, budget, min_step, feasible,
+                                           lambda result: result[position])
+    return results, simulations, stages
+
+### Feedback sweep (Tariff x S x X) on adaptive uptake-rate grids: every (T, S) pair starts from the coarse X and is ###
+### refined on metric (one of the FEEDBACK_TABLES) within tolerance, budget (simulations per pair) and min_step; ###
+### with M (Limited Qmax), uptake rates whose peak total demand exceeds (1+M) times the BAU peak are not simulated ###
+### runs on the pool of run_feedback_sweep, with the same engine, cache_dir, scratch_dir and timing_file options ###
+### returns the FEEDBACK_TABLES and PEAK_DEMAND_TABLE over every (S, x) sampled for any tariff, NaN where a pair's ###
+### grid has no such x or where the scenario is infeasible ###
+def run_adaptive_feedback_sweep(inp_file, Tariff, S, X, tolerance, budget = None, min_step = None,
+                                metric = 'Cost Savings Percentage', M = None, processes = None, cache_dir = None,
+                                cache_bytes = 512*1024**2, engine = 'epanet', timing_file = None, scratch_dir = None):
+    if processes is None:
+        processes = os.cpu_count() if 'fork' in multiprocessing.get_all_start_methods() else 1
+    refinement = (tolerance, budget, min_step, FEEDBACK_TABLES.index(metric), M)
+    per_pair = budget if budget is not None else len(X)
+    progress = SweepProgress(len(Tariff.columns)*len(S)*per_pair, name = 'adaptive feedback sweep')
+    timings = StageTimer()
+    pool = sweep._pool(processes, (inp_file, cache_dir, cache_bytes, engine, scratch_dir))
+    results = {}
+    try:
+        tasks = sweep._feedback_tasks(pool, processes, Tariff, S, X, timings)
+        tasks = [(task, refinement) for task in tasks]
+        for (task, _), (pair_results, simulations, stages) in zip(tasks, sweep._imap(pool, processes,
+                                                                                     _adaptive_feedback_task, tasks)):
+            timings.merge(stages)
+            timings.record((task[0], task[2]), stages, simulations)
+            progress.update(simulations)
+            progress.update(max(per_pair - simulations, 0), skipped = True)
+            results[task[0], task[2]] = pair_results
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        elif sweep._engine is not None:
+            sweep._engine.close()
+    if timing_file is not None:
+        write_summary(timing_file, progress, timings, engine = engine, processes = processes)
+
+    ### one row per (S, x) sampled for any tariff, in S then x order ###
+    scenarios = sorted(set((s, x) for (T, s), pair_results in results.items() for x in pair_results))
+    labels = [sweep._scenario_label(s, x) for s, x in scenarios]
+    tables = {}
+    for k, name in enumerate(FEEDBACK_TABLES + [PEAK_DEMAND_TABLE]):
+        table = pd.DataFrame(index = labels, columns = Tariff.columns, dtype = float)
+        for (T, s), pair_results in results.items():
+            for x, result in pair_results.items():
+                if result is not None:
+                    table.loc[sweep._scenario_label(s, x), T] = result[k]
+        tables[name] = table
+    return tables
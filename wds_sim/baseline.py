@@ -0,0 +1,13 @@
+from .network import hydraulics_energy, price_energy
+from .simulation import run_epanet_pumps
+
+### Baseline Stage: the business-as-usual (BAU) network does not depend on the tariff, ###
+### so it is simulated once and only the pricing is repeated for each tariff ###
+
+### Simulates the network with its current (original) demands, returns the hourly pump energy ###
+def simulate_baseline(wn, file_prefix = None):
+    return hydraulics_energy(wn,*run_epanet_pumps(wn, file_prefix))
+
+### Prices the baseline pump energy under every tariff column, same output as energy_cost for each ###
+def price_baseline(baseline, Tariff):
+    return {T: price_energy(baseline,Tariff[T]) for T in Tariff.columns}
@@ -0,0 +1,73 @@
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import wntr
+
+### Benchmark runner: each benchmark is a setup function returning the callable to time (so setup is never timed) ###
+### and the number of scenarios one call covers; the best of the repeats is kept, since the other runs only ###
+### add noise from the machine; peak memory is taken in a separate traced call, as tracing slows the code down ###
+### peak memory counts Python allocations (numpy and pandas included), not EPANET's own C allocations ###
+
+### Runs one benchmark, returns {'seconds', 'peak_memory_bytes', 'scenarios_per_second'} ###
+def run_benchmark(setup, repeat = 5):
+    function, scenarios = setup()
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    seconds = min(times)
+    return {'seconds': seconds, 'peak_memory_bytes': peak,
+            'scenarios_per_second': scenarios/seconds if scenarios and seconds > 0 else None}
+
+### Runs every benchmark of suite ({name: setup}), returns {name: result} ###
+def run_suite(suite, repeat = 5, log = print):
+    results = {}
+    for name, setup in suite.items():
+        results[name] = run_benchmark(setup, repeat)
+        log('{:<28} {:>10.2f} ms {:>10.1f} MiB peak {:>12}'.format(
+            name, results[name]['seconds']*1000, results[name]['peak_memory_bytes']/1024**2,
+            '{:.1f} scen/s'.format(results[name]['scenarios_per_second']) if results[name]['scenarios_per_second'] else ''))
+    return results
+
+### Versions and machine the results were measured on, saved with the baseline ###
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'wntr': wntr.__version__, 'machine': platform.machine(), 'processor': platform.processor()}
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'benchmarks': results}, f, indent = 2)
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+### Compares results with the baseline's: a benchmark regresses when its time or peak memory exceeds ###
+### the baseline's by more than tolerance (relative); returns the list of regression messages ###
+def compare(results, baseline, tolerance = 0.25, memory_tolerance = 0.25):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline['benchmarks'].get(name)
+        if reference is None:
+            continue
+        if result['seconds'] > reference['seconds']*(1+tolerance):
+            regressions.append('{}: {:.2f} ms, baseline {:.2f} ms (+{:.0%})'.format(
+                name, result['seconds']*1000, reference['seconds']*1000, result['seconds']/reference['seconds'] - 1))
+        ### a zero reference peak (nothing traced) gives no ratio to check ###
+        if reference['peak_memory_bytes'] and result['peak_memory_bytes'] > reference['peak_memory_bytes']*(1+memory_tolerance):
+            regressions.append('{}: {:.1f} MiB peak, baseline {:.1f} MiB (+{:.0%})'.format(
+                name, result['peak_memory_bytes']/1024**2, reference['peak_memory_bytes']/1024**2,
+                result['peak_memory_bytes']/reference['peak_memory_bytes'] - 1))
+    return regressions
@@ -0,0 +1,178 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from .network import assign_pooled_demand
+from .simulation import run_epanet_pumps
+from .timing import timed
+
+### Digests of the .inp files networks were read from, by (path, size, modification time): each file is hashed once ###
+_inp_digests = {}
+
+def _inp_digest(inp_file):
+    try:
+        stat = os.stat(inp_file)
+    except (OSError, TypeError, ValueError):
+        return ''
+    key = (os.path.abspath(inp_file), stat.st_size, stat.st_mtime_ns)
+    if key not in _inp_digests:
+        with open(inp_file, 'rb') as f:
+            _inp_digests[key] = hashlib.sha256(f.read()).hexdigest()
+    return _inp_digests[key]
+
+### Content-addressed on-disk cache of pump hydraulics (pump flowrates and pump node heads) ###
+### keyed by the network (its .inp file and link statuses), options and the (hours x junctions) demand matrix, ###
+### so bit-identical demand matrices are simulated only once across scenarios and script runs ###
+### the processes of a pool share the directory: max_bytes bounds the whole directory, each cache counting the ###
+### others' entries by rescanning it every rescan_every stores and whenever the bound is reached ###
+class HydraulicCache:
+
+    def __init__(self, directory, max_bytes = 512*1024**2, rescan_every = 64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_every = rescan_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok = True)
+        ### sizes of the stored entries, kept in memory to avoid listing the directory on each store ###
+        self._sizes = {}
+        self._stores = 0
+        self._rescan()
+
+    ### sizes of every entry in the directory, whichever process stored it ###
+    def _rescan(self):
+        self._sizes = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    self._sizes[entry.name[:-4]] = entry.stat().st_size
+                except OSError:
+                    pass
+
+    ### hash of everything the hydraulic results depend on in the sweeps: the .inp the network was read from ###
+    ### (wn.name), the status of every link (pumps and the pipes closed to isolate the tanks), the options, ###
+    ### controls and demands; variant separates results of engines that are not bit-identical to EpanetSimulator ###
+    @timed('cache')
+    def key(self, wn, demands_df, variant = ''):
+        h = hashlib.sha256()
+        if variant:
+            h.update(('variant='+variant).encode())
+        h.update(('inp='+_inp_digest(wn.name)).encode())
+        for section in [wn.options.time, wn.options.hydraulic, wn.options.energy]:
+            h.update(repr(section).encode())
+        for link_name in wn.link_name_list:
+            h.update((link_name+'='+str(wn.get_link(link_name).status)).encode())
+        h.update('|'.join(wn.control_name_list).encode())
+        h.update('|'.join(str(c) for c in demands_df.columns).encode())
+        h.update(np.asarray(demands_df.index, dtype = np.int64).tobytes())
+        h.update(np.ascontiguousarray(demands_df.values, dtype = float).tobytes())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key+'.npz')
+
+    ### returns (pump_flowrate, head) dataframes stored under key, or None ###
+    @timed('cache')
+    def load(self, key):
+        try:
+            with np.load(self._path(key)) as data:
+                index = data['index']
+                pump_flowrate = pd.DataFrame(data['flowrate'], index = index, columns = data['pumps'].tolist())
+                head = pd.DataFrame(data['head'], index = index, columns = data['nodes'].tolist())
+        except (OSError, KeyError, ValueError):
+            ### missing, evicted by another process or partially written entry ###
+            self.misses += 1
+            return None
+        ### touching the entry keeps recently used results away from eviction ###
+        os.utime(self._path(key))
+        self.hits += 1
+        return pump_flowrate, head
+
+    @timed('cache')
+    def store(self, key, pump_flowrate, head):
+        path = self._path(key)
+        tmp_path = path+'.'+str(os.getpid())+'.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, index = np.asarray(pump_flowrate.index),
+                     flowrate = np.asarray(pump_flowrate.values, dtype = float),
+                     head = np.asarray(head.values, dtype = float),
+                     pumps = np.array([str(c) for c in pump_flowrate.columns]),
+                     nodes = np.array([str(c) for c in head.columns]))
+        os.replace(tmp_path, path)
+        self._sizes[key] = os.path.getsize(path)
+        self._stores += 1
+        self._evict()
+
+    ### least recently used entries of the directory are removed until it fits in max_bytes ###
+    def _evict(self):
+        if self._stores % self.rescan_every == 0 or sum(self._sizes.values()) > self.max_bytes:
+            self._rescan()
+        if sum(self._sizes.values()) <= self.max_bytes:
+            return
+        entries = []
+        for key in list(self._sizes):
+            try:
+                entries.append((os.path.getmtime(self._path(key)), key))
+            except OSError:
+                del self._sizes[key]
+        entries.sort()
+        for mtime, key in entries:
+            if sum(self._sizes.values()) <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._sizes[key]
+            self.evictions += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._sizes), 'bytes': sum(self._sizes.values())}
+
+### Returns (pump_flowrate, head) for the demands, from the cache or by solving them: ###
+### with a ToolkitEngine (engine) or by assigning them to wn's pattern pool and running the EpanetSimulator ###
+### on a cache hit or with an engine the demands are not assigned to wn ###
+def simulate_pump_hydraulics(wn, demands_df, cache = None, file_prefix = None, engine = None):
+    if cache is not None:
+        key = cache.key(wn, demands_df, getattr(engine, 'cache_variant', ''))
+        hydraulics = cache.load(key)
+        if hydraulics is not None:
+            return hydraulics
+    if engine is not None:
+        hydraulics = engine.pump_hydraulics(demands_df)
+    else:
+        assign_pooled_demand(wn,demands_df)
+        hydraulics = run_epanet_pumps(wn, file_prefix)
+    if cache is not None:
+        cache.store(key, *hydraulics)
+    return hydraulics
+
+### Batched simulate_pump_hydraulics: cache hits are loaded, the misses are solved together when the engine ###
+### packs scenarios (pump_hydraulics_batch) and one by one otherwise ###
+### returns the list of (pump_flowrate, head) and the list of flags of the results that came from the cache ###
+def simulate_pump_hydraulics_batch(wn, demands_dfs, cache = None, file_prefix = None, engine = None):
+    if not hasattr(engine, 'pump_hydraulics_batch'):
+        hydraulics, cached = [], []
+        for demands_df in demands_dfs:
+            hits = cache.hits if cache is not None else 0
+            hydraulics.append(simulate_pump_hydraulics(wn, demands_df, cache, file_prefix, engine))
+            cached.append(cache is not None and cache.hits > hits)
+        return hydraulics, cached
+    hydraulics = [None]*len(demands_dfs)
+    keys = [None]*len(demands_dfs)
+    if cache is not None:
+        for i, demands_df in enumerate(demands_dfs):
+            keys[i] = cache.key(wn, demands_df, getattr(engine, 'cache_variant', ''))
+            hydraulics[i] = cache.load(keys[i])
+    cached = [result is not None for result in hydraulics]
+    misses = [i for i, result in enumerate(hydraulics) if result is None]
+    if misses:
+        for i, result in zip(misses, engine.pump_hydraulics_batch([demands_dfs[i] for i in misses])):
+            hydraulics[i] = result
+            if cache is not None:
+                cache.store(keys[i], *result)
+    return hydraulics, cached
@@ -0,0 +1,33 @@
+import numpy as np
+
+### Batched pricing of hourly pump energy under many tariffs at once ###
+### energy: (scenarios x hours) array, Tariff: (hours x tariffs) table as in Tariff.xlsx ###
+
+### Stacks the 'Energy (kWh)' column of pump energy dataframes into a (scenarios x hours) array ###
+def energy_matrix(energy_dfs):
+    return np.array([np.asarray(df["Energy (kWh)"], dtype = float) for df in energy_dfs])
+
+### Returns the hourly cost cube (scenarios x tariffs x hours) as one broadcast product ###
+### hours is the last (contiguous) axis so that summing it matches the per-tariff 'Cost' column sums ###
+### decimals = 2 rounds every hourly cost like energy_cost does, None keeps them unrounded ###
+def cost_cube(energy, Tariff, decimals = 2):
+    energy = np.atleast_2d(np.asarray(energy, dtype = float))
+    tariff = np.asarray(Tariff, dtype = float)
+    cube = energy[:, None, :] * tariff.T[None, :, :]
+    if decimals is not None:
+        cube = cube.round(decimals)
+    return cube
+
+### Returns the daily cost of every scenario under every tariff (scenarios x tariffs) ###
+### unrounded it is a single matrix product, rounded it sums the rounded hourly costs of the cube ###
+def total_costs(energy, Tariff, decimals = 2):
+    if decimals is None:
+        return np.atleast_2d(np.asarray(energy, dtype = float)) @ np.asarray(Tariff, dtype = float)
+    return cost_cube(energy, Tariff, decimals).sum(axis = -1)
+
+### Returns the daily energy of every scenario (rounded hourly values summed, as in energy_cost) ###
+def total_energy(energy, decimals = 2):
+    energy = np.atleast_2d(np.asarray(energy, dtype = float))
+    if decimals is not None:
+        energy = energy.round(decimals)
+    return energy.sum(axis = -1)
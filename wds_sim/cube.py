@@ -0,0 +1,46 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+### Preallocated results of a sweep: one float array (tariffs x scenario axes x metrics), e.g. (tariff, S, X, metric) ###
+### or (tariff, e, metric), filled in place as scenarios finish; labelled tables are only built at export ###
+### scenarios never filled (e.g. infeasible under Qmax) stay NaN ###
+class ResultsCube:
+
+    ### axes: list of the scenario axes' values, label: builds the row label of a scenario from its coordinates ###
+    ### (default: the value itself for one axis, a tuple for several) ###
+    def __init__(self, tariffs, axes, metrics, label = None):
+        self.tariffs = pd.Index(tariffs)
+        self.axes = [list(axis) for axis in axes]
+        self.metrics = list(metrics)
+        self._label = label
+        self._tariff_position = {T: i for i, T in enumerate(self.tariffs)}
+        self._axis_positions = [{value: i for i, value in enumerate(axis)} for axis in self.axes]
+        self.values = np.full((len(self.tariffs),) + tuple(len(axis) for axis in self.axes) + (len(self.metrics),), np.nan)
+
+    def _position(self, key):
+        T, coordinates = key[0], key[1:]
+        return (self._tariff_position[T],) + tuple(positions[value] for positions, value
+                                                   in zip(self._axis_positions, coordinates))
+
+    ### cube[T, *coordinates] = metric values of the scenario, in metrics order ###
+    def __setitem__(self, key, values):
+        self.values[self._position(key)] = values
+
+    def __getitem__(self, key):
+        return self.values[self._position(key)].tolist()
+
+    def _labels(self):
+        if self._label is not None:
+            return [self._label(*coordinates) for coordinates in itertools.product(*self.axes)]
+        if len(self.axes) == 1:
+            return self.axes[0]
+        return list(itertools.product(*self.axes))
+
+    ### Returns {metric: table (scenarios x tariffs)}, scenarios in the order of the product of the axes ###
+    def tables(self):
+        flat = self.values.reshape(len(self.tariffs), -1, len(self.metrics))
+        labels = self._labels()
+        return {metric: pd.DataFrame(flat[:, :, k].T.copy(), index = labels, columns = self.tariffs)
+                for k, metric in enumerate(self.metrics)}
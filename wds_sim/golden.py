@@ -0,0 +1,237 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from .network import HOURS, load_network
+from .simulation import run_epanet
+from .store import read_results
+from .sweep import FEEDBACK_TABLES, ELASTICITY_TABLES, PEAK_DEMAND_TABLE, run_feedback_sweep
+
+### Golden results: the result tables of a reference sweep, computed as the original scripts did (demands shifted ###
+### junction by junction and hour by hour, assign_demand, a full EpanetSimulator run read by BinFile, energy_cost), ###
+### none of the optimized paths being checked; kept as one compressed array (metrics x scenarios x tariffs) with ###
+### its labels, so faster engines (batching, caching, toolkit, ...) and the scripts' stored results can be checked ###
+### against them table by table and scenario by scenario ###
+
+### Absolute tolerance of each metric when none is given: the results are rounded to 2 decimals ###
+### (demand difference to 1), so an engine within solver noise may differ by one unit in the last place ###
+DEFAULT_TOLERANCES = {'Total Demand Difference': 0.1}
+DEFAULT_TOLERANCE = 0.01
+
+### Saves the tables {metric: table (scenarios x tariffs)}, all with the rows and columns of the first one ###
+def save_golden(path, tables):
+    metrics = list(tables)
+    index, columns = tables[metrics[0]].index, tables[metrics[0]].columns
+    values = np.stack([np.asarray(tables[metric].reindex(index = index, columns = columns), dtype = float)
+                       for metric in metrics])
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, values = values, metrics = np.array(metrics), rows = np.array([str(r) for r in index]),
+                            tariffs = np.array([str(T) for T in columns]))
+
+### Returns the golden tables saved at path, {metric: table (scenarios x tariffs)} ###
+def load_golden(path):
+    with np.load(path) as data:
+        rows, tariffs = data['rows'].tolist(), data['tariffs'].tolist()
+        return {metric: pd.DataFrame(data['values'][k], index = rows, columns = tariffs)
+                for k, metric in enumerate(data['metrics'].tolist())}
+
+### Compares tables with the golden ones, metric by metric and scenario by scenario ###
+### tolerances: {metric: absolute tolerance}, metrics not given use DEFAULT_TOLERANCES then tolerance ###
+### returns the diff report, one row per (metric, scenario, tariff) outside its tolerance: golden and engine values, ###
+### absolute difference and tolerance; a scenario missing from tables, or NaN on one side only, is reported too ###
+def compare_golden(golden, tables, tolerances = None, tolerance = DEFAULT_TOLERANCE):
+    tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    report = []
+    for metric, expected in golden.items():
+        atol = tolerances.get(metric, tolerance)
+        if metric in tables:
+            actual = tables[metric].copy()
+            actual.index = [str(r) for r in actual.index]
+            actual.columns = [str(T) for T in actual.columns]
+            actual = actual.reindex(index = expected.index, columns = expected.columns)
+        else:
+            actual = pd.DataFrame(np.nan, index = expected.index, columns = expected.columns)
+        e, a = expected.values, np.asarray(actual.values, dtype = float)
+        difference = np.abs(a - e)
+        ### atol itself is within tolerance, whatever the float error of the rounded values' difference ###
+        bad = (difference > atol + 1e-9) | (np.isnan(e) != np.isnan(a))
+        for i, j in zip(*np.nonzero(bad)):
+            report.append({'metric': metric, 'scenario': expected.index[i], 'tariff': expected.columns[j],
+                           'golden': e[i, j], 'engine': a[i, j], 'difference': difference[i, j], 'tolerance': atol})
+    return pd.DataFrame(report, columns = ['metric', 'scenario', 'tariff', 'golden', 'engine', 'difference', 'tolerance'])
+
+### Reference path, as in the original scripts ###
+
+### Returns all demands at each node and hour ###
+def _reference_demands(wn):
+    df = pd.DataFrame(index = HOURS)
+    for name in wn.junction_name_list:
+        lst = np.zeros(len(HOURS))
+        for demand in wn.get_node(name).demand_timeseries_list:
+            lst = np.add(lst,demand.base_value*wn.get_pattern(demand.pattern).multipliers)
+        df[name] = lst
+    return df.loc[:, df.sum() != 0]
+
+### returns a dataframe with energy consumption and cost ###
+def _reference_energy_cost(wn,results,Ta):
+    pump_flowrate = results.link['flowrate'].loc[:,wn.pump_name_list]
+    head = results.node['head']
+    df = wntr.metrics.pump_energy(pump_flowrate, head, wn)
+    df["Energy (kWh)"] = df.sum(axis=1)
+    df["tariff ($/KWh)"] = Ta
+    df['Cost'] = df["tariff ($/KWh)"] * df["Energy (kWh)"]
+    df = df.round(2)
+    return df
+
+### Simulates demands_df on a fresh copy of wn (assign_demand adds new patterns on every call) ###
+def _reference_simulation(wn, demands_df):
+    scenario_wn = copy.deepcopy(wn)
+    scenario_wn.assign_demand(demands_df,pattern_prefix = 'Reference')
+    return scenario_wn, run_epanet(scenario_wn)
+
+### Feedback model: new demands and (Demand Before, shifted demand, Demand After) of every junction ###
+def _reference_feedback_demands(original_demands_df, peak_hours, off_peak_hours, s, x):
+    new_demands_df = original_demands_df.copy()
+    response_details = {'Demand Before': [], 'shifted demand': [], 'Demand After': []}
+    for demand in new_demands_df.columns:
+        QT = 0
+        response_details['Demand Before'].append(original_demands_df[demand].sum())
+        for hour in new_demands_df.index:
+            if hour in peak_hours:
+                Delta = new_demands_df.loc[hour,demand]*x
+                new_demands_df.at[hour,demand] = new_demands_df.loc[hour,demand] - Delta
+                QT += Delta
+        response_details['shifted demand'].append(QT)
+        for hour in new_demands_df.index:
+            if hour in off_peak_hours:
+                new_demands_df.at[hour,demand] = new_demands_df.loc[hour,demand] + QT/s
+        response_details['Demand After'].append(new_demands_df[demand].sum())
+    return new_demands_df, pd.DataFrame(response_details, index = original_demands_df.columns)
+
+### Elasticity model: new demands and (Demand Before, shifted demand, Demand After) of every junction ###
+def _reference_elasticity_demands(original_demands_df, water_Ta, e):
+    mean = water_Ta.mean()
+    RT = 0
+    for value in water_Ta:
+        if value < mean:
+            RT += mean - value
+    new_demands_df = original_demands_df.copy()
+    response_details = {'Demand Before': [], 'shifted demand': [], 'Demand After': []}
+    for demand in new_demands_df.columns:
+        QT = 0
+        response_details['Demand Before'].append(original_demands_df[demand].sum())
+        for hour in new_demands_df.index:
+            if water_Ta.loc[hour] > mean:
+                new_demands_df.at[hour,demand] = abs(e*(water_Ta.loc[hour] - mean)*original_demands_df.loc[hour,demand]
+                                                     - original_demands_df.loc[hour,demand])
+                QT += abs(original_demands_df.loc[hour,demand] - new_demands_df.loc[hour,demand])
+        response_details['shifted demand'].append(round(QT,3))
+        for hour in new_demands_df.index:
+            if water_Ta.loc[hour] < mean:
+                new_demands_df.at[hour,demand] = original_demands_df.loc[hour,demand] + (QT/RT)*abs(mean - water_Ta.loc[hour])
+        response_details['Demand After'].append(new_demands_df[demand].sum())
+    return new_demands_df, pd.DataFrame(response_details, index = original_demands_df.columns)
+
+### Revenue of the demands under water tariff water_Ta ###
+def _reference_revenue(demands_df, water_Ta):
+    df = demands_df.copy()
+    df['Total Demands'] = df.sum(axis = 1)
+    df["tariff ($/GPH)"] = water_Ta
+    return (df["tariff ($/GPH)"] * df['Total Demands']).sum()
+
+### Reference feedback sweep: FEEDBACK_TABLES and PEAK_DEMAND_TABLE (S/X scenarios x tariffs), one scenario at a time ###
+def reference_feedback_tables(inp_file, Tariff, S, X):
+    wn = load_network(inp_file)
+    original_demands_df = _reference_demands(wn)
+    rows = ['S='+str(s)+' X='+str(x) for s in S for x in X]
+    tables = {metric: pd.DataFrame(np.nan, index = rows, columns = Tariff.columns)
+              for metric in FEEDBACK_TABLES + [PEAK_DEMAND_TABLE]}
+    for T in Tariff.columns:
+        scenario_wn, results = _reference_simulation(wn, original_demands_df)
+        pump_energy_original = _reference_energy_cost(scenario_wn,results,Tariff[T])
+        original_energy = pump_energy_original['Energy (kWh)'].sum()
+        original_cost = pump_energy_original['Cost'].sum()
+        sorted_df = pump_energy_original.sort_values(["tariff ($/KWh)","Cost"],ascending = True)
+        for s in S:
+            off_peak_hours = sorted_df['Cost'].iloc[0:s].index.tolist()
+            peak_hours = sorted_df['Cost'].iloc[len(sorted_df)-s:len(sorted_df)].index.tolist()
+            for x in X:
+                new_demands_df, response_details = _reference_feedback_demands(original_demands_df, peak_hours,
+                                                                               off_peak_hours, s, x)
+                scenario_wn, results_sim = _reference_simulation(wn, new_demands_df)
+                pump_energy = _reference_energy_cost(scenario_wn,results_sim,Tariff[T])
+                new_energy = pump_energy['Energy (kWh)'].sum()
+                new_cost = pump_energy['Cost'].sum()
+                scenario = 'S='+str(s)+' X='+str(x)
+                tables['Energy Savings Percentage'].at[scenario,T] = round((new_energy - original_energy)*100/original_energy ,2)
+                tables['Cost Savings Percentage'].at[scenario,T] = round((original_cost - new_cost)*100/original_cost,2)
+                tables['Total Demand Difference'].at[scenario,T] = round(response_details['Demand Before'].sum()
+                                                                         - response_details['Demand After'].sum(),1)
+                tables['Demand Shifted Percentage'].at[scenario,T] = round(response_details['shifted demand'].sum()*100
+                                                                           / response_details['Demand Before'].sum(),2)
+                tables[PEAK_DEMAND_TABLE].at[scenario,T] = new_demands_df.sum(axis = 1).max()
+    return tables
+
+### Reference elasticity sweep of the Same (water_tariff = Tariff) and Our Tariff scripts: ELASTICITY_TABLES ###
+### (elasticities x tariffs); with M (Limited Qmax), scenarios whose peak total demand exceeds (1+M) times the ###
+### original one are not simulated and stay NaN, as in the Limited scripts ###
+def reference_elasticity_tables(inp_file, Tariff, water_tariff, E, M = None):
+    wn = load_network(inp_file)
+    original_demands_df = _reference_demands(wn)
+    tables = {metric: pd.DataFrame(np.nan, index = E, columns = Tariff.columns) for metric in ELASTICITY_TABLES}
+    max_demand = original_demands_df.sum(axis = 1).max()
+    for T in Tariff.columns:
+        scenario_wn, results = _reference_simulation(wn, original_demands_df)
+        pump_energy_original = _reference_energy_cost(scenario_wn,results,Tariff[T])
+        original_energy = pump_energy_original['Energy (kWh)'].sum()
+        original_cost = pump_energy_original['Cost'].sum()
+        original_revenue = _reference_revenue(original_demands_df, water_tariff[T])
+        original_net = original_revenue - original_cost
+        for e in E:
+            new_demands_df, response_details = _reference_elasticity_demands(original_demands_df, water_tariff[T], e)
+            if M is not None and new_demands_df.sum(axis = 1).max() > (1+M)*max_demand:
+                continue
+            scenario_wn, results_sim = _reference_simulation(wn, new_demands_df)
+            pump_energy = _reference_energy_cost(scenario_wn,results_sim,Tariff[T])
+            new_energy = pump_energy['Energy (kWh)'].sum()
+            new_cost = pump_energy['Cost'].sum()
+            new_revenue = _reference_revenue(new_demands_df, water_tariff[T])
+            new_net = new_revenue - new_cost
+            tables['Energy Savings Percentage'].at[e,T] = round((new_energy - original_energy)*100/original_energy ,2)
+            tables['Cost Savings Percentage'].at[e,T] = round((original_cost - new_cost)*100/original_cost,2)
+            tables['Revenue Increase Percentage'].at[e,T] = round((new_revenue - original_revenue)*100/original_revenue,2)
+            tables['Net Increase Percentage'].at[e,T] = round((new_net - original_net)*100/abs(original_net),2)
+            tables['Total Demand Difference'].at[e,T] = round(response_details['Demand Before'].sum()
+                                                              - response_details['Demand After'].sum(),4)
+            tables['Demand Shifted Percentage'].at[e,T] = round(response_details['shifted demand'].sum()*100
+                                                                / response_details['Demand Before'].sum(),2)
+    return tables
+
+### Runs the reference feedback sweep and saves its tables as golden results ###
+def make_feedback_golden(path, inp_file, Tariff, S, X):
+    tables = reference_feedback_tables(inp_file, Tariff, S, X)
+    save_golden(path, tables)
+    return tables
+
+### Runs the reference elasticity sweep (see reference_elasticity_tables) and saves its tables as golden results ###
+def make_elasticity_golden(path, inp_file, Tariff, water_tariff, E, M = None):
+    tables = reference_elasticity_tables(inp_file, Tariff, water_tariff, E, M)
+    save_golden(path, tables)
+    return tables
+
+### Runs the feedback sweep with engine (and any other run_feedback_sweep options, e.g. cache_dir) on the ###
+### tariffs of the golden results and returns its diff report against them (empty: the engine reproduces them) ###
+def check_feedback_engine(path, inp_file, Tariff, S, X, engine, tolerances = None, **sweep_options):
+    golden = load_golden(path)
+    tables = run_feedback_sweep(inp_file, Tariff[golden[next(iter(golden))].columns], S, X, engine = engine,
+                                **sweep_options)
+    return compare_golden(golden, tables, tolerances)
+
+### Compares the result tables of a family in the results store (root), as written by an elasticity script, ###
+### with the golden results; returns the diff report ###
+def check_stored_results(path, root, family, tolerances = None):
+    golden = load_golden(path)
+    tables = read_results(root, family, list(golden), golden[next(iter(golden))].columns.tolist())
+    return compare_golden(golden, tables, tolerances)
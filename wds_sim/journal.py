@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def _jsonable(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.to_json(orient = 'split', double_precision = 15)
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError('sweep parameter not hashable: '+repr(value))
+
+### Hash of the parameters of a sweep, {name: value} (grids, tariff tables, margin M, ...) ###
+def sweep_digest(parameters):
+    return hashlib.sha256(json.dumps(parameters, sort_keys = True, default = _jsonable).encode()).hexdigest()
+
+### Append-only journal of finished scenarios, one JSON line per scenario: {"key": [...], "values": [...]} ###
+### each result is written (and flushed to disk) as soon as it completes, so a restarted run skips every ###
+### scenario already in the journal; a line cut short by a crash is ignored and that scenario is simply redone ###
+### with parameters (see sweep_digest), the first line is a header {"parameters": <digest>} and a journal written ###
+### by a sweep with other parameters (or without a header) is not resumed: it is moved to <path>.stale and the ###
+### sweep starts afresh ###
+class ScenarioJournal:
+
+    def __init__(self, path, parameters = None):
+        self.path = path
+        self.digest = sweep_digest(parameters) if parameters is not None else None
+        self._results = {}
+        complete = True
+        header = None
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    complete = line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'parameters' in entry:
+                        header = entry['parameters']
+                        continue
+                    self._results[tuple(entry['key'])] = entry['values']
+            if self.digest is not None and header != self.digest and (header is not None or self._results):
+                logger.warning('journal %s was written with other sweep parameters: not resumed, moved to %s',
+                               path, path+'.stale')
+                os.replace(path, path+'.stale')
+                self._results = {}
+                complete = True
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a')
+        if not complete:
+            ### new lines must not be appended to a line cut short ###
+            self._file.write('\n')
+        if new and self.digest is not None:
+            self._file.write(json.dumps({'parameters': self.digest})+'\n')
+            self._file.flush()
+
+    def __contains__(self, key):
+        return tuple(key) in self._results
+
+    def __getitem__(self, key):
+        return self._results[tuple(key)]
+
+    def __len__(self):
+        return len(self._results)
+
+    ### records the result values (a list, or None for a scenario without results) of the scenario key ###
+    def record(self, key, values):
+        values = None if values is None else [float(value) for value in values]
+        self._file.write(json.dumps({'key': list(key), 'values': values})+'\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._results[tuple(key)] = values
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    ### removes the journal once its results are safely in the final tables ###
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
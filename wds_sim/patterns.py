@@ -0,0 +1,124 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .network import HOURS, assign_pooled_demand
+from .simulation import SimulationEngine, run_epanet_pumps
+from .timing import timed
+
+### Pattern groups: Net3's demand junctions share a handful of base patterns ('1' to '5'), each junction's demand ###
+### being its base value times its pattern; the response models shift every junction in proportion to its own ###
+### demand, so all junctions of a pattern keep the same shape and the scenario demands are fully described by ###
+### one shifted multiplier series per group (hours x groups) and the unchanged base values ###
+### junctions with several demand entries form a group of their own, with base value 1 ###
+class PatternGroups:
+
+    def __init__(self, wn):
+        self.groups = {}
+        self.bases = {}
+        members = {}
+        multipliers = {}
+        default_pattern = wn.options.hydraulic.pattern
+        for name in wn.junction_name_list:
+            demands = wn.get_node(name).demand_timeseries_list
+            if len(demands) == 1:
+                pattern = demands[0].pattern_name or default_pattern
+                base = demands[0].base_value
+                if base == 0:
+                    continue
+                group = pattern if pattern is not None else ''
+                if group not in multipliers:
+                    multipliers[group] = (wn.get_pattern(pattern).multipliers if pattern is not None
+                                          else np.ones(len(HOURS)))
+            else:
+                ### whole demand of the junction as its own series ###
+                series = np.zeros(len(HOURS))
+                for demand in demands:
+                    pattern = demand.pattern_name or default_pattern
+                    series += demand.base_value*(wn.get_pattern(pattern).multipliers if pattern is not None else 1.0)
+                if not series.any():
+                    continue
+                group, base = 'Junction '+name, 1.0
+                multipliers[group] = series
+            self.groups[name] = group
+            self.bases[name] = base
+            members.setdefault(group, []).append(name)
+        self.members = members
+        ### demand per unit base value of each group (hours x groups), the input of the response models ###
+        self.multipliers = pd.DataFrame({group: np.asarray(values, dtype = float) for group, values in multipliers.items()},
+                                        index = HOURS)
+        self.junctions = list(self.groups)
+        self._group_position = np.array([list(self.multipliers.columns).index(self.groups[name]) for name in self.junctions])
+        self._base_values = np.array([self.bases[name] for name in self.junctions])
+        ### total base value of each group: junction demand totals of group multipliers are (multipliers @ weights) ###
+        self.weights = pd.Series({group: sum(self.bases[name] for name in names) for group, names in members.items()},
+                                 dtype = float)[self.multipliers.columns]
+
+    ### Junction demands of shifted group multipliers (... x hours x groups), e.g. for the demand totals ###
+    def junction_demands(self, group_demands):
+        return np.asarray(group_demands, dtype = float)[..., self._group_position]*self._base_values
+
+    ### Group multipliers (hours x groups) of a junction demand matrix, or None when the junctions of some group ###
+    ### are not scaled copies of one another (the demands did not come from a uniform response) ###
+    def group_demands(self, demands_df, rtol = 1e-9):
+        values = {}
+        for group, names in self.members.items():
+            if any(name not in demands_df.columns for name in names):
+                return None
+            demands = np.asarray(demands_df[names], dtype = float)/np.array([self.bases[name] for name in names])
+            if not np.allclose(demands, demands[:, :1], rtol = rtol, atol = 0):
+                return None
+            values[group] = demands[:, 0]
+        return pd.DataFrame(values, index = demands_df.index)[self.multipliers.columns]
+
+    ### Assigns group multipliers (hours x groups) to wn: one pattern per group (pattern_prefix + group) ###
+    ### overwritten in place, each junction keeping its base value, so a scenario rewrites a few patterns ###
+    ### instead of one per junction and the .inp carries only those ###
+    @timed('assign demand')
+    def assign(self, wn, group_demands, pattern_prefix = 'Group'):
+        demand_multiplier = wn.options.hydraulic.demand_multiplier
+        patterns = set(wn.pattern_name_list)
+        for group in self.multipliers.columns:
+            multipliers = np.asarray(group_demands[group], dtype = float)/demand_multiplier
+            pattern_name = pattern_prefix+group
+            if pattern_name in patterns:
+                wn.get_pattern(pattern_name).multipliers = multipliers
+            else:
+                wn.add_pattern(pattern_name, multipliers.tolist())
+        for name in self.junctions:
+            demands = wn.get_node(name).demand_timeseries_list
+            if len(demands) != 1 or demands[0].pattern_name != pattern_prefix+self.groups[name]:
+                demands.clear()
+                demands.append((self.bases[name], pattern_prefix+self.groups[name]))
+
+### Engine solving scenarios through their pattern groups: demands given per group (columns = the groups, as ###
+### shifted from groups.multipliers by the sweep) are assigned as they are, a junction demand matrix is first ###
+### reduced to its group multipliers; either way a few group patterns are rewritten and solved like ###
+### run_epanet_pumps; junction demands that are not uniform within a group go to the engine's copy of the ###
+### network through a pool of one pattern per junction (assign_pooled_demand) ###
+### base values and multipliers are written to the .inp with their own rounding, so results agree with the ###
+### pooled assignment to EPANET's accuracy (not bit for bit) ###
+class PatternGroupEngine(SimulationEngine):
+
+    cache_variant = 'groups'
+
+    def __init__(self, wn, file_prefix = None):
+        super().__init__(file_prefix, 'groups')
+        self._wn = copy.deepcopy(wn)
+        self.groups = PatternGroups(self._wn)
+        self.grouped = 0
+        self.ungrouped = 0
+
+    def pump_hydraulics(self, demands_df):
+        if list(demands_df.columns) == list(self.groups.multipliers.columns):
+            group_demands = demands_df
+        else:
+            group_demands = self.groups.group_demands(demands_df)
+        if group_demands is not None:
+            self.groups.assign(self._wn, group_demands)
+            self.grouped += 1
+        else:
+            assign_pooled_demand(self._wn, demands_df, 'Ungrouped')
+            self.ungrouped += 1
+        return run_epanet_pumps(self._wn, self._file_prefix)
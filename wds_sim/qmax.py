@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from .response import shift_demands_elasticity, shift_demands_feedback_batch
+from .sweep import FEEDBACK_TABLES
+
+### Limited Qmax: a scenario is feasible when its peak total hourly demand stays within (1+M) times the BAU peak, ###
+### infeasible scenarios are recorded as 0 in every result table; applied after the No Limits sweep, ###
+### so the constraint (and any number of margins) needs no simulation of its own ###
+
+### Returns the feasibility mask (margins x scenarios x tariffs) of the peak demands for every margin in M ###
+def qmax_feasible(peak_demand, max_demand, M):
+    limits = (1+np.asarray(M, dtype = float))*max_demand
+    return np.asarray(peak_demand, dtype = float)[None, :, :] <= limits[:, None, None]
+
+### Applies the Qmax constraint of every margin in M to the sweep result tables in one broadcast ###
+### returns {m: {table name: table with the infeasible scenarios set to 0}} ###
+def limit_qmax(tables, peak_demand, max_demand, M, names = FEEDBACK_TABLES):
+    feasible = qmax_feasible(peak_demand, max_demand, M)
+    values = np.stack([np.asarray(tables[name], dtype = float) for name in names])
+    limited = np.where(feasible[:, None, :, :], values[None, :, :, :], 0)
+    index, columns = tables[names[0]].index, tables[names[0]].columns
+    return {m: {name: pd.DataFrame(limited[i, j], index = index, columns = columns) for j, name in enumerate(names)}
+            for i, m in enumerate(M)}
+
+### Bisection for the Qmax boundary: the peak total demand of the shifted demands grows with the elasticity ###
+### (or uptake rate), so a tariff's scenarios are feasible up to a threshold, found from the demand transform ###
+### alone in a few steps, and only the scenarios below it need an EPANET run ###
+
+### Largest of the sorted values whose scenario is feasible (None if none is), feasible(value) being monotone ###
+def max_feasible(feasible, values):
+    lower, upper = -1, len(values)
+    while upper - lower > 1:
+        middle = (lower + upper)//2
+        if feasible(values[middle]):
+            lower = middle
+        else:
+            upper = middle
+    return values[lower] if lower >= 0 else None
+
+### Largest value in [lower, upper] whose scenario is feasible, to within tolerance (None if lower is not) ###
+def max_feasible_value(feasible, lower, upper, tolerance = 1e-4):
+    if not feasible(lower):
+        return None
+    if feasible(upper):
+        return upper
+    while upper - lower > tolerance:
+        middle = (lower + upper)/2
+        if feasible(middle):
+            lower = middle
+        else:
+            upper = middle
+    return lower
+
+### feasible(e) of the elasticity model under a water tariff: peak total hourly demand at most max_peak ###
+def elasticity_feasibility(original_demands_df, water_Ta, max_peak):
+    def feasible(e):
+        new, details = shift_demands_elasticity(original_demands_df, water_Ta, [e])
+        return new[0].sum(axis = 1).max() <= max_peak
+    return feasible
+
+### feasible(x) of the feedback model for setting s and the peak and off-peak hours (masks) ###
+def uptake_feasibility(original_demands_df, peak, off_peak, s, max_peak):
+    def feasible(x):
+        new, QT = shift_demands_feedback_batch(original_demands_df, peak, off_peak, s, [x])
+        return new[0].sum(axis = 1).max() <= max_peak
+    return feasible
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from .timing import timed
+
+### Vectorized demand response models: all scenarios of a tariff are shifted in one broadcast ###
+### original demands: (hours x junctions) dataframe as returned by all_demands ###
+
+### Columns of the response_details dataframe, in the order the scripts fill them ###
+RESPONSE_DETAILS = ['Demand Before', 'shifted demand', '% of demand shifted', 'Demand After']
+
+### Elasticity model: demand above the mean water tariff drops by e*(tariff - mean) of the original demand, ###
+### the shifted volume QT of each junction comes back in the hours below the mean, in proportion to (mean - tariff) ###
+### returns the shifted demands (elasticities x hours x junctions) and the response_details of every ###
+### elasticity as one dataframe indexed by (elasticity, junction), so details.loc[e] is the per-e table ###
+@timed('demand shift')
+def shift_demands_elasticity(original_demands_df, tariff, E):
+    tariff = pd.Series(np.asarray(tariff, dtype = float))
+    mean = tariff.mean()
+    peak = (tariff > mean).values
+    off_peak = (tariff < mean).values
+    ### Total Decrease in Tariff for Rebound, summed in hour order as in the scripts ###
+    RT = 0
+    for value in tariff:
+        if value < mean:
+            RT += mean - value
+
+    original = np.asarray(original_demands_df, dtype = float)
+    e = np.asarray(E, dtype = float)[:, None, None]
+    new = np.repeat(original[None, :, :], len(E), axis = 0)
+    deviation = (tariff.values - mean)[peak][None, :, None]
+    new[:, peak, :] = np.abs(e*deviation*original[peak] - original[peak])
+    QT = np.abs(original[peak] - new[:, peak, :]).sum(axis = 1)
+    if RT > 0:
+        rebound = np.abs(mean - tariff.values[off_peak])[None, :, None]
+        new[:, off_peak, :] = original[off_peak] + (QT/RT)[:, None, :]*rebound
+
+    before = np.broadcast_to(original.sum(axis = 0), QT.shape)
+    details = pd.DataFrame({'Demand Before': before.ravel(),
+                            'shifted demand': QT.round(3).ravel(),
+                            '% of demand shifted': ((QT*100)/before).round(2).ravel(),
+                            'Demand After': new.sum(axis = 1).ravel()},
+                           index = pd.MultiIndex.from_product([list(E), list(original_demands_df.columns)]),
+                           columns = RESPONSE_DETAILS)
+    return new, details
+
+### Feedback model, batched over the uptake rates: at the peak hours (mask) every junction gives up x of its demand, ###
+### the shifted total QT is spread evenly as QT/s over the off-peak hours (mask), for all x in X at once ###
+### returns the shifted demands (uptake rates x hours x junctions) and the shifted totals QT (uptake rates x junctions) ###
+@timed('demand shift')
+def shift_demands_feedback_batch(original_demands_df, peak, off_peak, s, X):
+    original = np.asarray(original_demands_df, dtype = float)
+    peak = np.asarray(peak, dtype = bool)
+    off_peak = np.asarray(off_peak, dtype = bool)
+    new = np.repeat(original[None, :, :], len(X), axis = 0)
+    Delta = original[peak][None, :, :]*np.asarray(X, dtype = float)[:, None, None]
+    new[:, peak, :] = original[peak] - Delta
+    ### summed over the hour axis (not the last one), hour after hour like the scalar loop ###
+    QT = Delta.sum(axis = 1)
+    new[:, off_peak, :] = new[:, off_peak, :] + (QT/s)[:, None, :]
+    return new, QT
+
+### Returns new demand patterns and response details of the feedback model (setting s, uptake rate x) ###
+def shift_demands_feedback(original_demands_df, peak_hours, off_peak_hours, s, x):
+    peak = original_demands_df.index.isin(peak_hours)
+    off_peak = original_demands_df.index.isin(off_peak_hours)
+    new, QT = shift_demands_feedback_batch(original_demands_df, peak, off_peak, s, [x])
+    new_demands_df = pd.DataFrame(new[0], index = original_demands_df.index, columns = original_demands_df.columns)
+    demand_before = original_demands_df.sum()
+    response_details = pd.DataFrame({'shifted demand': QT[0],
+                                     'Demand Before': demand_before,
+                                     'Demand After': new_demands_df.sum(),
+                                     '% of demand shifted': ((QT[0]*100)/demand_before).round(2)},
+                                    index = original_demands_df.columns)
+    return new_demands_df, response_details
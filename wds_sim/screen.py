@@ -0,0 +1,46 @@
+import hashlib
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+### Pre-screen of the scenarios before simulating them: a scenario whose shifted demands equal the original ###
+### demands (zero shift, e.g. the Flat tariff, whose water tariff never leaves its mean) takes the baseline's ###
+### hourly pump energy, and one whose demands equal those of a scenario already simulated (duplicate) takes ###
+### that scenario's; only the energy is reused, the pricing under each scenario's own tariff is redone ###
+class ScenarioScreen:
+
+    ### baseline: hourly pump energy of the original demands (simulate_baseline) ###
+    def __init__(self, original_demands_df, baseline):
+        self._original = np.asarray(original_demands_df, dtype = float)
+        self._baseline = baseline
+        ### digest of the demand matrix -> (scenario key, hourly pump energy) of its first simulation ###
+        self._simulated = {}
+        self.zero_shift = 0
+        self.duplicates = 0
+
+    @staticmethod
+    def _digest(demands):
+        return hashlib.sha1(np.ascontiguousarray(demands, dtype = float).tobytes()).digest()
+
+    ### returns the hourly pump energy of scenario key when it needs no simulation, None otherwise ###
+    def screen(self, key, demands_df):
+        demands = np.asarray(demands_df, dtype = float)
+        if demands.shape == self._original.shape and np.array_equal(demands, self._original):
+            self.zero_shift += 1
+            logger.info('screen: %s leaves the demands unchanged, baseline energy used', key)
+            return self._baseline
+        first = self._simulated.get(self._digest(demands))
+        if first is not None:
+            self.duplicates += 1
+            logger.info('screen: %s has the demands of %s, its energy reused', key, first[0])
+            return first[1]
+        return None
+
+    ### records the hourly pump energy of a simulated scenario, for its duplicates ###
+    def record(self, key, demands_df, energy):
+        self._simulated.setdefault(self._digest(demands_df), (key, energy))
+
+    def stats(self):
+        return {'zero_shift': self.zero_shift, 'duplicates': self.duplicates, 'simulated': len(self._simulated)}
@@ -0,0 +1,156 @@
+import contextlib
+import os
+import tempfile
+import uuid
+import warnings
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.epanet.util import FlowUnits, HydParam
+from wntr.network.io import write_inpfile
+
+from .network import pump_node_names
+from .timing import stage_timer
+
+### Scratch directory of the EPANET files (.inp, .rpt, .bin): set_scratch_dir, else the WDS_SIM_SCRATCH ###
+### environment variable, else /dev/shm (RAM-backed tmpfs, Linux) when writable, else the system temp directory ###
+SCRATCH_ENV = 'WDS_SIM_SCRATCH'
+_scratch_dir = None
+
+def set_scratch_dir(path):
+    global _scratch_dir
+    if path is not None:
+        os.makedirs(path, exist_ok = True)
+    _scratch_dir = path
+
+def scratch_dir():
+    if _scratch_dir is not None:
+        return _scratch_dir
+    path = os.environ.get(SCRATCH_ENV)
+    if path:
+        os.makedirs(path, exist_ok = True)
+        return path
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+### Unique file prefix in the scratch directory, e.g. <scratch>/wds-temp-<pid>-<random>: ###
+### no two workers, scenarios or concurrent runs ever share simulation files ###
+def scratch_prefix(name = 'temp'):
+    return os.path.join(scratch_dir(), 'wds-'+name+'-'+str(os.getpid())+'-'+uuid.uuid4().hex[:12])
+
+def remove_simulation_files(file_prefix):
+    for extension in ['.inp', '.rpt', '.bin']:
+        try:
+            os.remove(file_prefix+extension)
+        except FileNotFoundError:
+            pass
+
+### Yields a unique scratch prefix whose simulation files are removed on exit, errors included ###
+@contextlib.contextmanager
+def simulation_files(name = 'temp'):
+    file_prefix = scratch_prefix(name)
+    try:
+        yield file_prefix
+    finally:
+        remove_simulation_files(file_prefix)
+
+### Writes and solves the network like EpanetSimulator.run_sim, returns the binary output file ###
+def _solve(wn, file_prefix):
+    inpfile, rptfile, outfile = file_prefix+'.inp', file_prefix+'.rpt', file_prefix+'.bin'
+    with stage_timer.stage('inp write'):
+        write_inpfile(wn, inpfile, units = wn.options.hydraulic.inpfile_units, version = 2.2)
+    with stage_timer.stage('solve'):
+        en = wntr.epanet.toolkit.ENepanet(version = 2.2)
+        en.ENopen(inpfile, rptfile, outfile)
+        en.ENsolveH()
+        en.ENsolveQ()
+        en.ENreport()
+        en.ENclose()
+    return outfile
+
+### Runs the network like EpanetSimulator(wn).run_sim(file_prefix = file_prefix), same files and results, ###
+### with the .inp write, the EPANET solve and the parsing of the binary output timed as separate stages ###
+### without file_prefix, the files are written under a unique scratch prefix and removed once parsed ###
+def run_epanet(wn, file_prefix = None):
+    if file_prefix is None:
+        with simulation_files() as file_prefix:
+            return run_epanet(wn, file_prefix)
+    outfile = _solve(wn, file_prefix)
+    with stage_timer.stage('binary parse'):
+        return wntr.epanet.io.BinFile().read(outfile, False, wn.options.hydraulic.headloss == 'D-W')
+
+### Byte layout of EPANET's binary output: a prolog of 15 int32, the title (3 x 80 bytes), the .inp and .rpt ###
+### names (2 x 260), the chemical name and units (2 x 32), node and link IDs (32 bytes each), then the network ###
+### description and the energy section, followed by one record per report step of 4 node values (demand, head, ###
+### pressure, quality) per node and 8 link values (flow first) per link, all float32 in reporting units ###
+_PROLOG_INTS = 15
+_PROLOG_BYTES = 4*_PROLOG_INTS + 3*80 + 2*260 + 2*32
+_ID_BYTES = 32
+_PUMP_ENERGY_BYTES = 4 + 6*4
+
+### Reads only the flows of the links pumps and the heads of the nodes from a binary output file: the file is ###
+### memory-mapped and just those columns of the results are decoded, converted to SI like BinFile.read ###
+### returns (pump_flowrate, head) dataframes (report times x names), the same values as pump_hydraulics gives ###
+### from the full results of run_epanet ###
+def read_pump_hydraulics(outfile, pumps, nodes):
+    data = np.memmap(outfile, dtype = np.uint8, mode = 'r')
+    prolog = data[:4*_PROLOG_INTS].view(np.int32)
+    nnodes, ntanks, nlinks, npumps = (int(n) for n in prolog[2:6])
+    flow_units = FlowUnits(int(prolog[9]))
+    report_start, report_step, duration = (int(n) for n in prolog[12:15])
+    offset = _PROLOG_BYTES
+    node_names = [name.decode().rstrip('\x00') for name in data[offset:offset+_ID_BYTES*nnodes].view('S'+str(_ID_BYTES))]
+    offset += _ID_BYTES*nnodes
+    link_names = [name.decode().rstrip('\x00') for name in data[offset:offset+_ID_BYTES*nlinks].view('S'+str(_ID_BYTES))]
+    offset += _ID_BYTES*nlinks
+    ### link start/end/type, tank indices and areas, node elevations, link lengths and diameters, pump energy ###
+    offset += 4*(3*nlinks + 2*ntanks + nnodes + 2*nlinks) + _PUMP_ENERGY_BYTES*npumps + 4
+    report_times = np.arange(report_start, duration+report_step-(duration%report_step), report_step)
+    record = 4*nnodes + 8*nlinks
+    periods = min(len(report_times), (len(data) - offset)//(4*record))
+    if periods < len(report_times):
+        warnings.warn('Simulation did not converge at time '+str(report_times[periods])+' s.')
+    values = data[offset:offset+4*record*periods].view(np.float32).reshape(periods, record)
+    link_index = {name: i for i, name in enumerate(link_names)}
+    node_index = {name: i for i, name in enumerate(node_names)}
+    flows = values[:, [4*nnodes + link_index[name] for name in pumps]]
+    heads = values[:, [nnodes + node_index[name] for name in nodes]]
+    del values, prolog, data
+    pump_flowrate = pd.DataFrame(HydParam.Flow._to_si(flow_units, flows), index = report_times[:periods], columns = pumps)
+    head = pd.DataFrame(HydParam.HydraulicHead._to_si(flow_units, heads), index = report_times[:periods], columns = nodes)
+    return pump_flowrate, head
+
+### Runs the network like run_epanet but decodes only what pump energy needs: returns (pump_flowrate, head) ###
+### for the pumps and pump nodes of wn without building the full node and link result tables ###
+def run_epanet_pumps(wn, file_prefix = None):
+    if file_prefix is None:
+        with simulation_files() as file_prefix:
+            return run_epanet_pumps(wn, file_prefix)
+    outfile = _solve(wn, file_prefix)
+    with stage_timer.stage('binary parse'):
+        return read_pump_hydraulics(outfile, wn.pump_name_list, pump_node_names(wn))
+
+### Base of the engines standing in for run_epanet_pumps in the sweeps (ToolkitEngine, PackedEngine, ###
+### SnapshotEngine, PatternGroupEngine): ###
+### cache_variant keeps an engine's results apart in the HydraulicCache, '' for the engines whose results are ###
+### bit-identical to EpanetSimulator's, so they share the entries of the plain path ###
+### without file_prefix, the engine's files get a unique scratch prefix (named after the engine) removed on close ###
+class SimulationEngine:
+
+    cache_variant = ''
+
+    def __init__(self, file_prefix = None, name = 'engine'):
+        self._remove_files = file_prefix is None
+        self._file_prefix = scratch_prefix(name) if file_prefix is None else file_prefix
+
+    def close(self):
+        if self._remove_files:
+            remove_simulation_files(self._file_prefix)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,106 @@
+import importlib.util
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+### Columnar results store, the system of record of the sweep results: every family of results (e.g. ###
+### 'No Limits/Same Tariff') is one compressed Parquet dataset partitioned by tariff, <root>/<family>/tariff=<T>/, ###
+### with a row per scenario (elasticity, S/X pair or hour) and a column per metric, so readers load only the ###
+### metric columns and tariffs they ask for; the .xlsx copies of the scripts are an optional export ###
+### Parquet needs pyarrow or fastparquet, which are not required by the scripts: without either, a family is written ###
+### in the same layout as one CSV file per tariff, <root>/<family>/tariff=<T>/results.csv, read back the same way ###
+
+logger = logging.getLogger(__name__)
+
+### Columns kept next to the metrics: scenario label, and the positions restoring the tables' row and column order ###
+_ROW = 'row'
+_ROW_POSITION = 'row_position'
+_TARIFF = 'tariff'
+_TARIFF_POSITION = 'tariff_position'
+
+_CSV = 'results.csv'
+
+def _family_path(root, family):
+    return os.path.join(root, *family.split('/'))
+
+def _parquet_available():
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+### A family written as CSV (the fallback) has a results.csv in its tariff partitions ###
+def _is_csv(path):
+    return any(os.path.exists(os.path.join(path, partition, _CSV)) for partition in os.listdir(path))
+
+def _write_csv(path, frame):
+    for T, partition in frame.groupby(_TARIFF, sort = False):
+        os.makedirs(os.path.join(path, _TARIFF+'='+T))
+        partition.drop(columns = _TARIFF).to_csv(os.path.join(path, _TARIFF+'='+T, _CSV), index = False)
+
+def _read_csv(path, columns, tariffs):
+    frames = []
+    for partition in sorted(os.listdir(path)):
+        T = partition[len(_TARIFF)+1:]
+        if tariffs is None or T in tariffs:
+            frame = pd.read_csv(os.path.join(path, partition, _CSV),
+                                usecols = (lambda name: name in columns) if columns is not None else None)
+            frame.insert(0, _TARIFF, T)
+            frames.append(frame)
+    return pd.concat(frames, ignore_index = True)
+
+### Writes the result tables of a family, {metric: table (scenarios x tariffs)}, replacing its earlier results ###
+def write_results(root, family, tables):
+    names = list(tables)
+    index, columns = tables[names[0]].index, tables[names[0]].columns
+    frame = pd.DataFrame({_TARIFF: np.repeat(np.asarray(columns, dtype = str), len(index)),
+                          _TARIFF_POSITION: np.repeat(np.arange(len(columns)), len(index)),
+                          _ROW: np.tile(np.asarray(index), len(columns)),
+                          _ROW_POSITION: np.tile(np.arange(len(index)), len(columns))})
+    for name in names:
+        ### column-major, so each tariff's scenarios are contiguous ###
+        frame[name] = np.asarray(tables[name].reindex(index = index, columns = columns), dtype = float).ravel(order = 'F')
+    path = _family_path(root, family)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    if _parquet_available():
+        frame.to_parquet(path, partition_cols = [_TARIFF], index = False)
+    else:
+        logger.warning('no Parquet engine (pyarrow or fastparquet) installed: %s written as CSV', family)
+        _write_csv(path, frame)
+
+### Writes the table (rows x metrics) of a single tariff, e.g. the hourly results of the specific analysis ###
+def write_table(root, family, T, table):
+    write_results(root, family, {name: table[[name]].set_axis([T], axis = 1) for name in table.columns})
+
+### with names None, every metric column is read ###
+def _read(root, family, names, tariffs):
+    path = _family_path(root, family)
+    columns = [_TARIFF, _TARIFF_POSITION, _ROW, _ROW_POSITION] + list(names) if names is not None else None
+    if _is_csv(path):
+        return _read_csv(path, columns, [str(T) for T in tariffs] if tariffs is not None else None)
+    filters = [(_TARIFF, 'in', list(tariffs))] if tariffs is not None else None
+    frame = pd.read_parquet(path, columns = columns, filters = filters)
+    frame[_TARIFF] = frame[_TARIFF].astype(str)
+    return frame
+
+### Reads the metrics in names of a family, returns {metric: table (scenarios x tariffs)} in the order written ###
+### with tariffs, only those partitions are read ###
+def read_results(root, family, names, tariffs = None):
+    frame = _read(root, family, names, tariffs)
+    rows = frame.drop_duplicates(_ROW_POSITION).sort_values(_ROW_POSITION)
+    columns = frame.drop_duplicates(_TARIFF_POSITION).sort_values(_TARIFF_POSITION)
+    tables = {}
+    for name in names:
+        table = frame.pivot(index = _ROW_POSITION, columns = _TARIFF_POSITION, values = name)
+        tables[name] = pd.DataFrame(table.loc[rows[_ROW_POSITION], columns[_TARIFF_POSITION]].values,
+                                    index = rows[_ROW].values, columns = columns[_TARIFF].tolist())
+    return tables
+
+### Reads the table (rows x metrics) of a single tariff; with columns, only those metrics ###
+def read_table(root, family, T, columns = None):
+    if columns is None:
+        columns = [name for name in _read(root, family, None, [T]).columns
+                   if name not in (_TARIFF, _TARIFF_POSITION, _ROW, _ROW_POSITION)]
+    tables = read_results(root, family, columns, [T])
+    return pd.DataFrame({name: tables[name][T] for name in columns})
@@ -0,0 +1,120 @@
+import copy
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .network import assign_pooled_demand, hydraulics_energy
+from .patterns import PatternGroups
+from .simulation import run_epanet_pumps
+
+logger = logging.getLogger(__name__)
+
+### Surrogate of the hourly pump energy: with the tanks isolated and the pump statuses fixed, every hour is an ###
+### independent steady state, so each pump's hourly energy is a smooth function of that hour's demands alone; ###
+### under a uniform response (every junction of a pattern group scaled alike) those reduce to the total demand ###
+### of each pattern group, and a polynomial of those few totals is fitted by least squares to EPANET runs ###
+### the surrogate screens candidate demand patterns (thousands per second), only the best go to simulation ###
+### library only: none of the sweep scripts use it, their results all come from simulation ###
+class EnergySurrogate:
+
+    def __init__(self, wn, degree = 3):
+        self.degree = degree
+        self.groups = PatternGroups(wn)
+        self.pumps = list(wn.pump_name_list)
+        self._columns = self.groups.junctions
+        members = [self.groups.groups[name] for name in self._columns]
+        ### (junctions x groups) 0/1 matrix summing the junction demands of each group ###
+        self._membership = (np.array(members)[:, None] == np.array(self.groups.multipliers.columns)[None, :]).astype(float)
+        self._terms = [terms for d in range(degree + 1)
+                       for terms in itertools.combinations_with_replacement(range(self._membership.shape[1]), d)]
+        self.coefficients = None
+        self.scale = None
+        ### errors of the validation runs: hourly and daily total pump energy, and the hourly residuals ###
+        ### (predicted - simulated total energy, runs x hours) that price into each tariff's cost error ###
+        self.error = None
+        self.residuals = None
+
+    ### demands (... x hours x junctions, columns as in all_demands) -> polynomial features (... x hours x terms) ###
+    def features(self, demands):
+        if isinstance(demands, pd.DataFrame):
+            demands = demands[self._columns].values
+        totals = np.asarray(demands, dtype = float) @ self._membership
+        if self.scale is not None:
+            totals = totals/self.scale
+        return np.stack([np.prod(totals[..., list(terms)], axis = -1) if terms else np.ones(totals.shape[:-1])
+                         for terms in self._terms], axis = -1)
+
+    ### fits the coefficients to hourly energies (scenarios x hours x pumps) of demand matrices (scenarios x hours x ###
+    ### junctions); the runs in validation (list of positions) are left out of the fit and give the error bounds ###
+    def fit(self, demands, energies, validation = ()):
+        demands = np.asarray(demands, dtype = float)
+        energies = np.asarray(energies, dtype = float)
+        train = np.setdiff1d(np.arange(len(demands)), validation)
+        self.scale = np.abs(demands[train] @ self._membership).reshape(-1, self._membership.shape[1]).max(axis = 0)
+        self.scale[self.scale == 0] = 1.0
+        X = self.features(demands[train]).reshape(-1, len(self._terms))
+        self.coefficients = np.linalg.lstsq(X, energies[train].reshape(-1, len(self.pumps)), rcond = None)[0]
+        check = validation if len(validation) else train
+        predicted = self.predict(demands[check]).sum(axis = -1)
+        actual = energies[check].sum(axis = -1)
+        self.residuals = predicted - actual
+        hourly = np.abs(self.residuals)
+        daily = np.abs(predicted.sum(axis = -1) - actual.sum(axis = -1))
+        self.error = {'hourly_max': float(hourly.max()), 'hourly_rmse': float(np.sqrt((hourly**2).mean())),
+                      'daily_max': float(daily.max()), 'daily_max_relative': float((daily/actual.sum(axis = -1)).max()),
+                      'validated': bool(len(validation))}
+        logger.info('energy surrogate: %d terms, hourly energy error up to %.3g, daily up to %.3g%%', len(self._terms),
+                    self.error['hourly_max'], self.error['daily_max_relative']*100)
+        return self
+
+    ### hourly energy of each pump (... x hours x pumps) of demand matrices (... x hours x junctions) ###
+    def predict(self, demands):
+        return self.features(demands) @ self.coefficients
+
+    ### daily energy cost (...) under tariff Ta (hours), unrounded ###
+    def predict_cost(self, demands, Ta):
+        return (self.predict(demands).sum(axis = -1)*np.asarray(Ta, dtype = float)).sum(axis = -1)
+
+    ### bound of the daily cost error under tariff Ta: the quantile of the validation runs' daily cost errors ###
+    ### (hourly residuals priced under Ta), calibrated rather than guaranteed, for demands like the training ones ###
+    def cost_error_bound(self, Ta, quantile = 0.95):
+        return float(np.quantile(np.abs(self.residuals @ np.asarray(Ta, dtype = float)), quantile))
+
+    ### Positions of the candidates (candidates x hours x junctions) worth simulating: the top lowest predicted costs, ###
+    ### plus every candidate whose cost could still beat the top-th once the error bound is allowed for ###
+    def screen(self, candidates, Ta, top = 10):
+        costs = self.predict_cost(candidates, Ta)
+        order = np.argsort(costs)
+        if len(order) <= top:
+            return order
+        bound = self.cost_error_bound(Ta)
+        return order[costs[order] <= costs[order[top - 1]] + 2*bound]
+
+### Random training demands: each hour's demands scaled by a factor drawn uniformly in [low, high] (a uniform ###
+### response moves every group of an hour alike), times a group factor within 1 +/- jitter, so shifted patterns ###
+### of both response models are covered ###
+def random_group_demands(groups, original_demands_df, scenarios, low = 0.4, high = 1.6, jitter = 0.1, seed = 0):
+    rng = np.random.default_rng(seed)
+    shape = (scenarios,) + groups.multipliers.shape
+    factors = rng.uniform(low, high, shape[:2])[:, :, None]*rng.uniform(1 - jitter, 1 + jitter, shape)
+    return [pd.DataFrame(groups.junction_demands(groups.multipliers.values*factors[k]), index = original_demands_df.index,
+                         columns = groups.junctions)[original_demands_df.columns] for k in range(scenarios)]
+
+### Trains a surrogate on EPANET runs (EpanetSimulator path) of demands_dfs, by default random group demands ###
+### the last validation share of the runs is kept out of the fit to bound the surrogate's error ###
+### the runs assign their demands to a copy of wn, whose own demands are left as they are ###
+def train_energy_surrogate(wn, original_demands_df, demands_dfs = None, scenarios = 80, degree = 3, validation = 0.25,
+                           seed = 0):
+    wn = copy.deepcopy(wn)
+    surrogate = EnergySurrogate(wn, degree)
+    if demands_dfs is None:
+        demands_dfs = random_group_demands(surrogate.groups, original_demands_df, scenarios, seed = seed)
+    energies = []
+    for demands_df in demands_dfs:
+        assign_pooled_demand(wn,demands_df)
+        energies.append(hydraulics_energy(wn,*run_epanet_pumps(wn))[surrogate.pumps].values)
+    held_out = int(round(validation*len(demands_dfs)))
+    demands = np.stack([demands_df[surrogate._columns].values for demands_df in demands_dfs])
+    return surrogate.fit(demands, np.stack(energies), validation = np.arange(len(demands_dfs) - held_out, len(demands_dfs)))
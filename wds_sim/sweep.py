@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+
+import pandas as pd
+
+from .baseline import price_baseline
+from .cache import HydraulicCache, _inp_digest, simulate_pump_hydraulics_batch
+from .costing import energy_matrix, total_costs, total_energy
+from .cube import ResultsCube
+from .journal import ScenarioJournal
+from .network import load_network, all_demands, hydraulics_energy, price_energy
+from .response import shift_demands_feedback_batch
+from .packed import PackedEngine
+from .patterns import PatternGroupEngine
+from .simulation import set_scratch_dir
+from .snapshot import SnapshotEngine
+from .timing import StageTimer, SweepProgress, stage_timer, write_summary
+from .toolkit import ToolkitEngine
+
+logger = logging.getLogger(__name__)
+
+### Names of the result tables produced by the feedback (S, X) sweep ###
+FEEDBACK_TABLES = ['Energy Savings Percentage', 'Cost Savings Percentage',
+                   'Total Demand Difference', 'Demand Shifted Percentage']
+
+### Names of the result tables of the elasticity (E) sweeps of the Same and Our Tariff scripts ###
+ELASTICITY_TABLES = ['Energy Savings Percentage', 'Cost Savings Percentage', 'Revenue Increase Percentage',
+                     'Net Increase Percentage', 'Total Demand Difference', 'Demand Shifted Percentage']
+
+### Name of the table of the scenarios' peak total hourly demand, kept for the Limited Qmax post-filter ###
+PEAK_DEMAND_TABLE = 'Peak Total Demand'
+
+### Network, original demands, hydraulic cache and toolkit engine of the current worker, loaded once by _init_worker ###
+### engine: 'epanet' (EpanetSimulator runs), 'toolkit', 'packed', 'snapshot' or 'groups' (see their engine classes) ###
+_wn = None
+_original_demands_df = None
+_cache = None
+_engine = None
+
+def _init_worker(inp_file, cache_dir = None, cache_bytes = None, engine = 'epanet', scratch_dir = None):
+    global _wn, _original_demands_df, _cache, _engine
+    if scratch_dir is not None:
+        set_scratch_dir(scratch_dir)
+    _wn = load_network(inp_file)
+    _original_demands_df = all_demands(_wn)
+    _cache = HydraulicCache(cache_dir, cache_bytes) if cache_dir is not None else None
+    if engine == 'toolkit':
+        _engine = ToolkitEngine(_wn, _original_demands_df)
+    elif engine == 'packed':
+        _engine = PackedEngine(_wn)
+    elif engine == 'snapshot':
+        _engine = SnapshotEngine(_wn)
+    elif engine == 'groups':
+        _engine = PatternGroupEngine(_wn)
+    elif engine == 'epanet':
+        _engine = None
+    else:
+        raise ValueError('unknown engine: '+str(engine))
+    if _engine is not None and multiprocessing.parent_process() is not None:
+        ### a pool worker closes its engine (removing its scratch files) when it exits ###
+        multiprocessing.util.Finalize(_engine, _engine.close, exitpriority = 10)
+
+### Returns the hourly pump energy of each demand matrix and whether it came from the cache ###
+### each EPANET run writes its files under a unique scratch prefix, removed once parsed ###
+def _simulate_batch(demands_dfs):
+    hydraulics, cached = simulate_pump_hydraulics_batch(_wn, demands_dfs, _cache, engine = _engine)
+    return [(hydraulics_energy(_wn,*result), flag) for result, flag in zip(hydraulics, cached)]
+
+def _simulate(demands_df):
+    return _simulate_batch([demands_df])[0]
+
+### Task: BAU simulation (hourly pump energy), run once for all tariffs, by EpanetSimulator whatever the engine: ###
+### the peak and off-peak hours are ranked on its costs, so ties (e.g. under the Flat tariff) break the same way ###
+### and every engine shifts the same hours ###
+### every task also returns the time of each of its stages (StageTimer.capture) ###
+def _baseline_task(task):
+    with stage_timer.capture() as stages:
+        hydraulics, cached = simulate_pump_hydraulics_batch(_wn, [_original_demands_df], _cache)
+        result = (hydraulics_energy(_wn,*hydraulics[0]), cached[0])
+    return result, stages
+
+### Task: every uptake rate X of one (T, S) pair, demands of all x shifted in one batch ###
+### returns, for each x, the four result values in FEEDBACK_TABLES order, the peak total demand and the cache flag ###
+def _feedback_task(task):
+    with stage_timer.capture() as stages:
+        rows = _feedback_rows(task)
+    return rows, stages
+
+### with the pattern group engine, only the group multipliers (hours x groups) are shifted and passed to the engine, ###
+### never expanded to junctions; the demand totals are then the group totals weighted by the groups' base values, ###
+### equal to the junction sums up to float rounding (summed in another order), the shifted hours being the same ###
+def _feedback_rows(task):
+    T, Ta, s, X, peak_hours, off_peak_hours, original_energy, original_cost = task
+    peak = _original_demands_df.index.isin(peak_hours)
+    off_peak = _original_demands_df.index.isin(off_peak_hours)
+    groups = getattr(_engine, 'groups', None)
+    if groups is not None:
+        demands = groups.multipliers
+        shifted, QT = shift_demands_feedback_batch(demands, peak, off_peak, s, X)
+        weights = groups.weights.values
+        hourly = shifted @ weights
+        demand_before = (demands.values @ weights).sum()
+        demand_after = hourly.sum(axis = 1)
+        shifted_totals = QT @ weights
+        peak_demands = hourly.max(axis = 1)
+    else:
+        demands = _original_demands_df
+        shifted, QT = shift_demands_feedback_batch(demands, peak, off_peak, s, X)
+        demand_before = demands.sum().sum()
+        demand_after = shifted.sum(axis = (1, 2))
+        shifted_totals = QT.sum(axis = 1)
+        peak_demands = shifted.sum(axis = 2).max(axis = 1)
+    new_demands_dfs = [pd.DataFrame(shifted[i], index = demands.index, columns = demands.columns) for i in range(len(X))]
+    rows = []
+    for i, (energy, cached) in enumerate(_simulate_batch(new_demands_dfs)):
+        pump_energy = price_energy(energy,Ta)
+        new_energy = pump_energy['Energy (kWh)'].sum()
+        new_cost = pump_energy['Cost'].sum()
+        rows.append(((round((new_energy - original_energy)*100/original_energy ,2),
+                      round((original_cost - new_cost)*100/original_cost,2),
+                      round(demand_before - demand_after[i],1),
+                      round(shifted_totals[i] * 100 / demand_before,2),
+                      peak_demands[i]), cached))
+    return rows
+
+### Process pool start method: fork lets workers start without re-running the calling script ###
+def _pool_context():
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+### Opens the worker pool, or loads the network in-process when running serially (returns None) ###
+def _pool(processes, initargs):
+    if processes <= 1:
+        _init_worker(*initargs)
+        return None
+    return _pool_context().Pool(processes, initializer = _init_worker, initargs = initargs)
+
+### Maps tasks over the pool (or in-process) lazily, yielding results in submission order as they complete ###
+def _imap(pool, processes, function, tasks):
+    if pool is None:
+        return (function(task) for task in tasks)
+    chunksize = max(1, len(tasks)//(4*processes))
+    return pool.imap(function, tasks, chunksize)
+
+def _map(pool, processes, function, tasks):
+    return list(_imap(pool, processes, function, tasks))
+
+### Row label of a (S, X) scenario in the result tables ###
+def _scenario_label(s, x):
+    return 'S='+str(s)+' X='+str(x)
+
+### BAU simulated once and priced under every tariff, then one task per (T, S) pair with all of X, ###
+### the peak and off-peak hours taken from the sorted BAU costs ###
+def _feedback_tasks(pool, processes, Tariff, S, X, timings):
+    (baseline, cached), stages = _map(pool, processes, _baseline_task, [None])[0]
+    timings.merge(stages)
+    timings.record('BAU', stages)
+    bau = price_baseline(baseline, Tariff)
+    original_energy = total_energy(energy_matrix([baseline]))[0]
+    original_costs = total_costs(energy_matrix([baseline]), Tariff)[0]
+    tasks = []
+    for original_cost, (T, pump_energy_original) in zip(original_costs, bau.items()):
+        sorted_df = pump_energy_original.sort_values(["tariff ($/KWh)","Cost"],ascending = True)
+        for s in S:
+            off_peak_hours = sorted_df['Cost'].iloc[0:s].index.tolist()
+            peak_hours = sorted_df['Cost'].iloc[len(sorted_df)-s:len(sorted_df)].index.tolist()
+            tasks.append((T, Tariff[T], s, X, peak_hours, off_peak_hours, original_energy, original_cost))
+    return tasks
+
+### Parameters of a feedback sweep its journal is tied to (see ScenarioJournal) ###
+def feedback_parameters(inp_file, Tariff, S, X):
+    return {'inp': _inp_digest(inp_file), 'Tariff': Tariff, 'S': S, 'X': X}
+
+### Runs the (Tariff x S x X) feedback sweep on a process pool: the FEEDBACK_TABLES and PEAK_DEMAND_TABLE ###
+### cache_dir (HydraulicCache), journal_file or journal (ScenarioJournal) and timing_file (write_summary) are optional ###
+def run_feedback_sweep(inp_file, Tariff, S, X, processes = None, cache_dir = None, cache_bytes = 512*1024**2,
+                       engine = 'epanet', journal_file = None, timing_file = None, scratch_dir = None, journal = None):
+    if processes is None:
+        ### without fork, workers would re-execute the (unguarded) calling script: run serially ###
+        processes = os.cpu_count() if 'fork' in multiprocessing.get_all_start_methods() else 1
+    ### a journal passed in is left open, for the caller to remove() ###
+    own_journal = journal is None and journal_file is not None
+    if own_journal:
+        journal = ScenarioJournal(journal_file, feedback_parameters(inp_file, Tariff, S, X))
+    progress = SweepProgress(len(Tariff.columns)*len(S)*len(X), name = 'feedback sweep')
+    timings = StageTimer()
+    pool = _pool(processes, (inp_file, cache_dir, cache_bytes, engine, scratch_dir))
+    try:
+        ### First Part: BAU simulated once, then priced under every tariff ###
+        ### Second Part: every (T, S) pair with all of X ###
+        tasks = _feedback_tasks(pool, processes, Tariff, S, X, timings)
+
+        ### results filled in place: (tariff, S, X, metric) ###
+        cube = ResultsCube(Tariff.columns, [S, X], FEEDBACK_TABLES + [PEAK_DEMAND_TABLE], label = _scenario_label)
+
+        ### pairs whose scenarios are all in the journal are not run again ###
+        if journal is not None:
+            resumed = [(task[0], task[2], x) for task in tasks for x in X if (task[0], task[2], x) in journal]
+            for key in resumed:
+                cube[key] = journal[key]
+            progress.update(len(resumed), skipped = True)
+            tasks_to_run = [task for task in tasks if any((task[0], task[2], x) not in journal for x in X)]
+            logger.info('journal: %d scenarios resumed', len(resumed))
+        else:
+            tasks_to_run = tasks
+        hits = misses = 0
+        for task, (task_rows, stages) in zip(tasks_to_run, _imap(pool, processes, _feedback_task, tasks_to_run)):
+            timings.merge(stages)
+            ### the uptake rates of a pair are solved as one batch, so the pair is one timing row ###
+            timings.record((task[0], task[2]), stages, len(X))
+            progress.update(sum((task[0], task[2], x) not in journal for x in X) if journal is not None else len(X))
+            for x, (row, cached) in zip(X, task_rows):
+                cube[task[0], task[2], x] = row
+                hits += cached
+                misses += not cached
+                if journal is not None:
+                    journal.record((task[0], task[2], x), row)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        elif _engine is not None:
+            _engine.close()
+        if own_journal:
+            journal.close()
+
+    if cache_dir is not None:
+        logger.info('hydraulic cache: %d hits, %d misses', hits, misses)
+    if timing_file is not None:
+        write_summary(timing_file, progress, timings, engine = engine, processes = processes,
+                      cache = {'hits': hits, 'misses': misses} if cache_dir is not None else None)
+
+    ### one table per metric, built from the cube at the end ###
+    return cube.tables()
@@ -0,0 +1,167 @@
+import contextlib
+import functools
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+### Hot-path instrumentation: the time spent in each stage of the scenario simulations ###
+### stages: 'demand shift', 'assign demand', 'inp write', 'solve', 'binary parse', 'all demands', 'energy cost', ###
+### 'cache' and 'bookkeeping' (the rest of a task: dataframes, rounding, result tables) ###
+### totals are kept per stage over the run, and per scenario (or per task of a batched sweep) to find slow ones ###
+class StageTimer:
+
+    def __init__(self):
+        ### stage -> [seconds, calls] ###
+        self.stages = {}
+        ### (scenario key, number of scenarios covered, {stage: seconds}) in the order they finished ###
+        self.scenarios = []
+
+    def add(self, stage, seconds, calls = 1):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += calls
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    ### adds the stages of another timer (e.g. returned by a worker) ###
+    def merge(self, stages):
+        for stage, (seconds, calls) in stages.items():
+            self.add(stage, seconds, calls)
+
+    ### keeps the stages of one scenario, or of one task covering several (e.g. all X of a (T, S) pair), as its row ###
+    def record(self, key, stages, scenarios = 1):
+        self.scenarios.append((key, scenarios, {stage: seconds for stage, (seconds, calls) in stages.items()}))
+
+    def reset(self):
+        self.stages = {}
+        self.scenarios = []
+
+    ### returns the stages timed since the last reset and resets them; with elapsed (the wall time ###
+    ### of the task), the time outside every stage is added as 'bookkeeping' ###
+    def pop(self, elapsed = None):
+        stages = self.stages
+        if elapsed is not None:
+            ### bookkeeping already there (from the scenarios timed inside) is part of the elapsed time ###
+            rest = max(0.0, elapsed - sum(seconds for seconds, calls in stages.values()))
+            stages.setdefault('bookkeeping', [0.0, 0])
+            stages['bookkeeping'][0] += rest
+            stages['bookkeeping'][1] += 1
+        self.stages = {}
+        return stages
+
+    ### times the stages of a task apart from the rest: yields a dict filled, on exit, with the stages timed inside ###
+    ### (bookkeeping included) while the stages timed before are kept aside and restored ###
+    @contextlib.contextmanager
+    def capture(self):
+        outer, captured = self.stages, {}
+        self.stages = {}
+        start = time.perf_counter()
+        try:
+            yield captured
+        finally:
+            captured.update(self.pop(time.perf_counter() - start))
+            self.stages = outer
+
+    ### times one scenario of a serial loop (key, e.g. (T, e)): its stages count in the totals as usual and are ###
+    ### kept as the scenario's row ###
+    @contextlib.contextmanager
+    def scenario(self, key):
+        with self.capture() as stages:
+            yield stages
+        self.merge(stages)
+        self.record(key, stages)
+
+    ### per stage: total seconds, calls, mean ms per scenario and share of the timed total ###
+    def summary(self, scenarios):
+        total = sum(seconds for seconds, calls in self.stages.values())
+        return {stage: {'seconds': round(seconds, 6), 'calls': calls,
+                        'ms_per_scenario': round(seconds*1000/scenarios, 3) if scenarios else None,
+                        'share': round(seconds/total, 4) if total else None}
+                for stage, (seconds, calls) in sorted(self.stages.items(), key = lambda item: -item[1][0])}
+
+    ### one row per recorded scenario: its key, the scenarios it covers, total seconds and seconds of each stage ###
+    def scenario_summary(self):
+        return [{'scenario': list(key) if isinstance(key, tuple) else key, 'scenarios': scenarios,
+                 'seconds': round(sum(stages.values()), 6),
+                 'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()}}
+                for key, scenarios, stages in self.scenarios]
+
+### Timer of the current process, fed by the timed functions of the package ###
+stage_timer = StageTimer()
+
+### Decorator timing every call of a function as one stage of stage_timer ###
+def timed(stage):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage_timer.stage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+### Throughput of a sweep: scenarios per second and ETA, logged at most every interval seconds ###
+class SweepProgress:
+
+    def __init__(self, total, interval = 10.0, name = 'sweep'):
+        self.total = total
+        self.interval = interval
+        self.name = name
+        self.done = 0
+        self.skipped = 0
+        self.start = time.perf_counter()
+        self._logged = self.start
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    ### scenarios simulated per second (skipped, e.g. resumed, scenarios excluded) ###
+    def rate(self):
+        elapsed = self.elapsed()
+        return self.done/elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        rate = self.rate()
+        remaining = self.total - self.done - self.skipped
+        return remaining/rate if rate > 0 else None
+
+    ### counts n scenarios as done, or as skipped (not simulated in this run) ###
+    def update(self, n = 1, skipped = False):
+        if skipped:
+            self.skipped += n
+        else:
+            self.done += n
+        now = time.perf_counter()
+        if now - self._logged >= self.interval or self.done + self.skipped >= self.total:
+            self._logged = now
+            eta = self.eta()
+            logger.info('%s: %d/%d scenarios, %.1f scenarios/s, ETA %s', self.name, self.done + self.skipped,
+                        self.total, self.rate(), time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else '-')
+
+    def summary(self):
+        return {'name': self.name, 'scenarios': self.total, 'simulated': self.done, 'skipped': self.skipped,
+                'wall_seconds': round(self.elapsed(), 3), 'scenarios_per_second': round(self.rate(), 3)}
+
+### Writes the machine-readable summary of a run (JSON): throughput, per-stage times, the per-scenario stage ###
+### times ('scenario_stages', with the slowest scenarios' keys in 'slowest_scenarios') and any extra fields ###
+### serial: the stages were all timed in this process since the start of progress (timer reset then), ###
+### so the rest of its wall time is added as bookkeeping ###
+def write_summary(path, progress, timer = stage_timer, serial = False, slowest = 10, **extra):
+    if serial:
+        timer.stages = timer.pop(progress.elapsed())
+    summary = progress.summary()
+    summary['stages'] = timer.summary(progress.done)
+    summary['scenario_stages'] = timer.scenario_summary()
+    summary['slowest_scenarios'] = [row['scenario'] for row in sorted(summary['scenario_stages'],
+                                                                      key = lambda row: -row['seconds'])[:slowest]]
+    summary.update(extra)
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent = 2)
+    return summary
@@ -0,0 +1,106 @@
+import copy
+import ctypes
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.epanet.util import FlowUnits, HydParam, to_si
+
+from .network import pump_node_names
+from .simulation import SimulationEngine
+from .timing import stage_timer, timed
+
+### EPANET toolkit parameter codes ###
+EN_PATTERN = 2
+EN_HEAD = 10
+EN_FLOW = 8
+
+### EPANET's factors from its internal units (cfs, ft) to the reporting flow units and head ###
+FLOW_UCF = {'CFS': 1.0, 'GPM': 448.831, 'MGD': 0.64632, 'IMGD': 0.5382, 'AFD': 1.9837,
+            'LPS': 28.317, 'LPM': 1699.0, 'MLD': 2.4466, 'CMH': 101.94, 'CMD': 2446.6}
+METERS_PER_FOOT = 0.3048
+
+### EPANET writes the binary output from single precision hydraulics in internal units, ###
+### converted to reporting units and stored in single precision again: reproduced here so the ###
+### in-memory values are bit-identical to those EpanetSimulator reads from the .bin file ###
+def _binary_precision(values, ucf):
+    internal = np.asarray(values, dtype = float)/ucf
+    return (internal.astype(np.float32).astype(float)*ucf).astype(np.float32)
+
+### Keeps one EPANET project open through the toolkit and re-solves only the hydraulics per scenario ###
+### every demand junction gets one pattern when the engine is opened (base demand 1, like assign_demand), ###
+### each scenario overwrites those multipliers in place and reads pump flows and heads from memory, ###
+### so no .inp is written, no project is re-opened and no binary output is parsed per scenario ###
+class ToolkitEngine(SimulationEngine):
+
+    def __init__(self, wn, demands_df, file_prefix = None):
+        super().__init__(file_prefix, 'toolkit')
+        file_prefix = self._file_prefix
+        self._wn = copy.deepcopy(wn)
+        self._wn.assign_demand(demands_df, pattern_prefix = 'Toolkit')
+        self._demand_multiplier = self._wn.options.hydraulic.demand_multiplier
+        self._pumps = self._wn.pump_name_list
+        self._nodes = pump_node_names(self._wn)
+        self._report_step = int(self._wn.options.time.report_timestep)
+        self._duration = int(self._wn.options.time.duration)
+
+        ### the project is written and opened once, with the network's own units ###
+        inpfile = file_prefix+'.inp'
+        wntr.epanet.io.InpFile().write(inpfile, self._wn, units = self._wn.options.hydraulic.inpfile_units)
+        self._en = wntr.epanet.toolkit.ENepanet()
+        self._en.ENopen(inpfile, file_prefix+'.rpt', '')
+        self._flow_units = FlowUnits(self._en.ENgetflowunits())
+        self._flow_ucf = FLOW_UCF[self._flow_units.name]
+        self._head_ucf = 1.0 if self._flow_units.is_traditional else METERS_PER_FOOT
+        self._pump_index = [self._en.ENgetlinkindex(name) for name in self._pumps]
+        self._node_index = [self._en.ENgetnodeindex(name) for name in self._nodes]
+        self._pattern_index = {name: int(self._en.ENgetnodevalue(self._en.ENgetnodeindex(name), EN_PATTERN))
+                               for name in demands_df.columns}
+        self._en.ENopenH()
+
+    ### overwrites the multipliers of a pattern (EN_setpattern is not wrapped by wntr's toolkit) ###
+    def _set_pattern(self, index, multipliers):
+        if getattr(self._en, '_project', None) is not None:
+            values = (ctypes.c_double*len(multipliers))(*multipliers)
+            self._en.errcode = self._en.ENlib.EN_setpattern(self._en._project, index, values, len(multipliers))
+        else:
+            values = (ctypes.c_float*len(multipliers))(*multipliers)
+            self._en.errcode = self._en.ENlib.ENsetpattern(index, values, len(multipliers))
+        self._en._error()
+
+    ### pushes the scenario demands (hours x junctions, m3/s) as the new pattern multipliers ###
+    ### multipliers are rounded to the 6 decimals the .inp writer uses, as EpanetSimulator would see them ###
+    @timed('assign demand')
+    def set_demands(self, demands_df):
+        for name in demands_df.columns:
+            multipliers = np.asarray(demands_df[name], dtype = float)/self._demand_multiplier
+            self._set_pattern(self._pattern_index[name], [float('{:f}'.format(m)) for m in multipliers])
+
+    ### solves the hydraulics for demands_df, returns (pump_flowrate, head) like pump_hydraulics ###
+    def pump_hydraulics(self, demands_df):
+        self.set_demands(demands_df)
+        times, flows, heads = [], [], []
+        with stage_timer.stage('solve'):
+            self._en.ENinitH(10)
+            while True:
+                t = self._en.ENrunH()
+                if t % self._report_step == 0 and t <= self._duration and (not times or times[-1] != t):
+                    times.append(t)
+                    flows.append([self._en.ENgetlinkvalue(i, EN_FLOW) for i in self._pump_index])
+                    heads.append([self._en.ENgetnodevalue(i, EN_HEAD) for i in self._node_index])
+                if self._en.ENnextH() <= 0:
+                    break
+        flows = _binary_precision(flows, self._flow_ucf)
+        heads = _binary_precision(heads, self._head_ucf)
+        pump_flowrate = pd.DataFrame(to_si(self._flow_units, flows, HydParam.Flow),
+                                     index = times, columns = self._pumps)
+        head = pd.DataFrame(to_si(self._flow_units, heads, HydParam.HydraulicHead),
+                            index = times, columns = self._nodes)
+        return pump_flowrate, head
+
+    def close(self):
+        if self._en is not None:
+            self._en.ENcloseH()
+            self._en.ENclose()
+            self._en = None
+            super().close()